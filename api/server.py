@@ -4,7 +4,6 @@ import uvicorn
 import asyncio
 import concurrent.futures
 import datetime
-import re
 import threading
 import queue
 from fastapi import FastAPI, HTTPException, Depends, Header, BackgroundTasks, Request
@@ -12,13 +11,16 @@ from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, Dict, Any
 
-from utils import setup_logger, load_config, WechatNotifier
+from utils import setup_logger, load_config, resolve_path, WechatNotifier
 from downloaders import create_downloader
 from transcriber import Transcriber
 
 # 创建日志记录器
 logger = setup_logger("api_server")
 
+# 文件名非法字符替换表
+_SANITIZE_TABLE = str.maketrans(dict.fromkeys('\\/*?:"<>|', "_"))
+
 # 创建API应用
 app = FastAPI(
     title="VideoTranscriptAPI",
@@ -43,7 +45,7 @@ max_workers = config.get("concurrent", {}).get("max_workers", 3)
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
 
 # 创建企业微信通知器
-wechat_notifier = WechatNotifier()
+wechat_notifier = WechatNotifier(config=config)
 
 # 任务队列
 task_queue = asyncio.Queue(config.get("concurrent", {}).get("queue_size", 10))
@@ -212,7 +214,7 @@ def process_transcription(task_id, url):
             platform = "youtube"
             video_id = downloader.extract_video_id(url)
         
-        output_dir = config.get("storage", {}).get("output_dir", "./output")
+        output_dir = resolve_path(config.get("storage", {}).get("output_dir", "./output"))
         existing_files = []
         video_title = ""
         author = ""
@@ -282,7 +284,7 @@ def process_transcription(task_id, url):
                 
             except Exception as e:
                 logger.exception(f"将LLM任务加入队列失败: {str(e)}")
-                wechat_notifier.send_text(f"【LLM任务加入队列失败】{str(e)}")
+                wechat_notifier.send_text_async(f"【LLM任务加入队列失败】{str(e)}")
             
             return {
                 "status": "success",
@@ -311,19 +313,19 @@ def process_transcription(task_id, url):
         subtitle = None
         if downloader.__class__.__name__ == "YoutubeDownloader":
             logger.info(f"尝试获取字幕: {url}")
-            subtitle = downloader.get_subtitle(url)
+            subtitle = downloader.get_subtitle(url, video_info=video_info)
         
         if subtitle:
             # 如果有字幕，直接使用
             logger.info(f"使用平台提供的字幕: {url}")
             
             # 保存字幕文件，文件名格式为yyMMdd-hhmmss_平台_videoid_安全标题.txt
-            output_dir = config.get("storage", {}).get("output_dir", "./output")
+            output_dir = resolve_path(config.get("storage", {}).get("output_dir", "./output"))
             timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
             # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
+            safe_title = video_title.translate(_SANITIZE_TABLE)
             # 限制标题长度，防止文件名过长
-            safe_title = safe_title[:50] if len(safe_title) > 50 else safe_title
+            safe_title = safe_title[:50]
             subtitle_filename = f"{timestamp_prefix}_{video_info.get('platform')}_{video_info.get('video_id')}_{safe_title}.txt"
             subtitle_path = os.path.join(output_dir, subtitle_filename)
             
@@ -357,7 +359,7 @@ def process_transcription(task_id, url):
                 
             except Exception as e:
                 logger.exception(f"将LLM任务加入队列失败（平台字幕）: {str(e)}")
-                wechat_notifier.send_text(f"【LLM任务加入队列失败】{str(e)}")
+                wechat_notifier.send_text_async(f"【LLM任务加入队列失败】{str(e)}")
             # ======= END =======
             
             result = {
@@ -414,9 +416,9 @@ def process_transcription(task_id, url):
                 # 转录文件名，格式为yyMMdd-hhmmss_平台_videoid
                 timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
                 # 清理文件名中的非法字符
-                safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
+                safe_title = video_title.translate(_SANITIZE_TABLE)
                 # 限制标题长度，防止文件名过长
-                safe_title = safe_title[:50] if len(safe_title) > 50 else safe_title
+                safe_title = safe_title[:50]
                 output_base = f"{timestamp_prefix}_{video_info.get('platform')}_{video_info.get('video_id')}_{safe_title}"
                 
                 # 创建转录器并转录
@@ -452,7 +454,7 @@ def process_transcription(task_id, url):
                     
                 except Exception as e:
                     logger.exception(f"将LLM任务加入队列失败（常规转录）: {str(e)}")
-                    wechat_notifier.send_text(f"【LLM任务加入队列失败】{str(e)}")
+                    wechat_notifier.send_text_async(f"【LLM任务加入队列失败】{str(e)}")
                 # ======= END =======
                 
                 # 返回结果
@@ -3,38 +3,231 @@ import re
 import json
 import requests
 import time
+import queue
+import logging
+import atexit
+import threading
+import functools
+import itertools
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from abc import ABC, abstractmethod
-from urllib.parse import urlparse, parse_qs
-from utils import setup_logger, load_config, ensure_dir
+from urllib.parse import urlparse, parse_qs, urlsplit
+from utils import setup_logger, load_config, ensure_dir, resolve_path, create_debug_dir, TTLCache
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
 
 # 创建日志记录器
 logger = setup_logger("downloaders")
 
+# 所有下载器共享的HTTP会话，复用TCP/TLS连接
+# 连接池层只重试建立连接失败的情况，读超时和错误状态码仍由make_api_request按配置重试
+_RETRY = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=100, max_retries=_RETRY))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=100, max_retries=_RETRY))
+
+
+def _dump_json(path, obj, indent=True):
+    """
+    将数据保存为JSON文件
+    
+    参数:
+        path: 文件路径
+        obj: 要保存的数据
+        indent: 是否缩进格式化，关闭时序列化更快
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=option))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(obj, ensure_ascii=False, indent=2 if indent else None))
+
+
+class _DebugWriter:
+    """
+    后台调试文件写入器，把调试数据的序列化和磁盘写入移出请求处理路径
+    """
+    def __init__(self, maxsize=256):
+        """
+        初始化写入器
+        
+        参数:
+            maxsize: 等待写入的最大文件数，队列满时退回同步写入
+        """
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def submit(self, path, obj, indent=True):
+        """
+        提交一个调试文件写入任务
+        
+        参数:
+            path: 文件路径
+            obj: 要保存的数据
+            indent: 是否缩进格式化
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((path, obj, indent))
+        except queue.Full:
+            logger.warning(f"调试文件写入队列已满，改为同步写入: {path}")
+            _dump_json(path, obj, indent)
+    
+    def flush(self):
+        """
+        等待所有已提交的调试文件写入完成
+        """
+        if self._thread is not None:
+            self._queue.join()
+    
+    def _ensure_started(self):
+        """
+        首次提交时启动后台写入线程
+        """
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+                    self._thread.start()
+                    # 进程退出前写完队列中剩余的文件
+                    atexit.register(self.flush)
+    
+    def _run(self):
+        """
+        后台线程：依次取出并写入调试文件
+        """
+        while True:
+            path, obj, indent = self._queue.get()
+            try:
+                _dump_json(path, obj, indent)
+            except Exception as e:
+                logger.error(f"写入调试文件失败: {path}, 错误: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+
+_debug_writer = _DebugWriter()
+
+# 下载文件名序号，以进程启动时间（约毫秒精度）为起点单调递增，避免同一秒内的请求文件名冲突
+_FILE_SEQ = itertools.count(time.time_ns() >> 20)
+
+# 调试目录，首次使用时再创建
+_DEBUG_DIR = None
+
+def _debug_dir():
+    """
+    获取调试目录，首次调用时创建
+    
+    返回:
+        str: 调试目录路径
+    """
+    global _DEBUG_DIR
+    if _DEBUG_DIR is None:
+        _DEBUG_DIR = create_debug_dir()
+    return _DEBUG_DIR
+
+# TikHub API成功响应缓存，键为(端点, 参数)
+# 响应中的下载地址是带签名且会过期的CDN链接，只短时间缓存，避免重复提交时拿到失效链接
+_api_cache = TTLCache(maxsize=2048, ttl=300)
+
+# 短链接解析结果缓存，短链接指向的地址不会变化
+_short_url_cache = TTLCache(maxsize=4096, ttl=86400)
+
+
+class _Trunc:
+    """
+    日志参数包装，只有日志真正被格式化输出时才截取字符串
+    """
+    __slots__ = ("s", "n")
+    
+    def __init__(self, s, n):
+        self.s = s
+        self.n = n
+    
+    def __str__(self):
+        return self.s[:self.n]
+
 class BaseDownloader(ABC):
     """
     下载器基类，定义了下载器的通用接口和功能
     """
+    # 可处理的域名集合（同时匹配其子域名），由子类定义
+    DOMAINS = frozenset()
+    
     def __init__(self):
         """
         初始化下载器
         """
         self.config = load_config()
         self.api_key = self.config.get("tikhub", {}).get("api_key")
-        self.temp_dir = self.config.get("storage", {}).get("temp_dir", "./temp")
+        self.temp_dir = resolve_path(self.config.get("storage", {}).get("temp_dir", "./temp"))
+        self.session = _SESSION
+        # 本实例已获取的视频信息，键为URL
+        self._info_cache = {}
         ensure_dir(self.temp_dir)
         
-    @abstractmethod
-    def can_handle(self, url):
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def get_host(url):
+        """
+        获取URL的主机名（小写）
+        
+        同一URL在工厂、can_handle和ID提取中会被多次查询，结果按URL缓存
+        
+        参数:
+            url: 视频URL，可以不带协议头
+            
+        返回:
+            str: 主机名，无法解析时返回空字符串
+        """
+        if "//" not in url:
+            url = "//" + url
+        try:
+            return urlsplit(url).hostname or ""
+        except ValueError:
+            return ""
+    
+    @staticmethod
+    def host_matches(host, domain):
+        """
+        判断主机名是否为指定域名或其子域名
+        
+        参数:
+            host: 主机名
+            domain: 域名
+            
+        返回:
+            bool: 是否匹配
         """
-        判断是否可以处理该URL
+        return host == domain or host.endswith("." + domain)
+    
+    def can_handle(self, url, host=None):
+        """
+        判断是否可以处理该URL，按主机名逐级去掉子域名在DOMAINS中查找
         
         参数:
             url: 视频URL
+            host: 已解析的主机名，如果为None则从URL中解析
             
         返回:
             bool: 是否可以处理
         """
-        pass
+        if host is None:
+            host = self.get_host(url)
+        while host:
+            if host in self.DOMAINS:
+                return True
+            _, _, host = host.partition(".")
+        return False
     
     @abstractmethod
     def get_video_info(self, url):
@@ -53,12 +246,13 @@ class BaseDownloader(ABC):
         pass
     
     @abstractmethod
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         """
         获取字幕，如果有的话
         
         参数:
             url: 视频URL
+            video_info: 已获取的视频信息，传入时不再重复请求
             
         返回:
             str: 字幕文本，如果没有则返回None
@@ -75,8 +269,13 @@ class BaseDownloader(ABC):
         返回:
             str: 原始长链接
         """
+        resolved = _short_url_cache.get(url)
+        if resolved is not None:
+            return resolved
+        
         try:
-            response = requests.head(url, allow_redirects=True, timeout=10)
+            response = self.session.head(url, allow_redirects=True, timeout=10)
+            _short_url_cache.set(url, response.url)
             return response.url
         except Exception as e:
             logger.error(f"解析短链接失败: {url}, 错误: {str(e)}")
@@ -99,7 +298,7 @@ class BaseDownloader(ABC):
             # 创建目录（如果不存在）
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
             
-            response = requests.get(url, stream=True, timeout=60)
+            response = self.session.get(url, stream=True, timeout=60)
             response.raise_for_status()
             
             with open(local_path, 'wb') as f:
@@ -133,6 +332,59 @@ class BaseDownloader(ABC):
             logger.error(f"删除文件失败: {file_path}, 错误: {str(e)}")
             return False
     
+    def _write_debug(self, path, obj):
+        """
+        保存完整API响应用于调试，仅在DEBUG日志级别下写入，由后台线程异步完成
+        
+        参数:
+            path: 文件路径
+            obj: 要保存的数据
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            _debug_writer.submit(path, obj)
+    
+    def _write_error(self, path, obj):
+        """
+        保存错误响应用于排查问题，始终写入但不做缩进格式化
+        
+        参数:
+            path: 文件路径
+            obj: 要保存的数据
+        """
+        _debug_writer.submit(path, obj, indent=False)
+    
+    def _log_response_preview(self, log, response, limit=500):
+        """
+        在DEBUG日志级别下记录API响应的前若干字符
+        
+        参数:
+            log: 日志记录器
+            response: API响应
+            limit: 预览长度
+        """
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        if orjson is not None:
+            preview = orjson.dumps(response, option=orjson.OPT_NON_STR_KEYS)[:limit].decode("utf-8", errors="replace")
+        else:
+            preview = json.dumps(response, ensure_ascii=False)[:limit]
+        log.debug(f"API完整响应: {preview}...")
+    
+    @staticmethod
+    def _response_json(response):
+        """
+        解析HTTP响应中的JSON，优先使用orjson直接解析原始字节
+        
+        参数:
+            response: requests响应对象
+            
+        返回:
+            解析后的数据
+        """
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+    
     def make_api_request(self, endpoint, params=None):
         """
         调用TikHub API
@@ -153,6 +405,15 @@ class BaseDownloader(ABC):
         max_retries = tikhub_config.get("max_retries", 3)
         retry_delay = tikhub_config.get("retry_delay", 2)
         timeout = tikhub_config.get("timeout", 30)
+        cache_ttl = tikhub_config.get("cache_ttl", 300)
+        
+        # 相同端点和参数的成功响应在有效期内直接复用
+        cache_key = (endpoint, tuple(sorted((params or {}).items())))
+        if cache_ttl > 0:
+            cached = _api_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"命中API响应缓存: {endpoint}, 参数: {params}")
+                return cached
         
         # 首先尝试主API密钥
         api_key = self.api_key
@@ -174,6 +435,7 @@ class BaseDownloader(ABC):
         # 尝试使用主API密钥
         response = self._try_api_request(url, headers, params, max_retries, retry_delay, timeout)
         if response:
+            self._cache_api_response(cache_key, response, cache_ttl)
             return response
             
         # 如果主API密钥失败，尝试备用API密钥
@@ -188,6 +450,7 @@ class BaseDownloader(ABC):
             
             response = self._try_api_request(url, headers, params, max_retries, retry_delay, timeout)
             if response:
+                self._cache_api_response(cache_key, response, cache_ttl)
                 return response
                 
         # 如果所有尝试都失败
@@ -197,6 +460,18 @@ class BaseDownloader(ABC):
         logger.error(error_message)
         raise ValueError(error_message)
     
+    def _cache_api_response(self, cache_key, response, cache_ttl):
+        """
+        缓存成功的API响应，错误响应不缓存
+        
+        参数:
+            cache_key: 缓存键
+            response: API响应
+            cache_ttl: 缓存有效期(秒)，为0时不缓存
+        """
+        if cache_ttl > 0 and response.get("code") == 200:
+            _api_cache.set(cache_key, response, cache_ttl)
+    
     def _try_api_request(self, url, headers, params, max_retries, retry_delay, timeout):
         """
         尝试API请求，包含重试逻辑
@@ -223,7 +498,7 @@ class BaseDownloader(ABC):
                 logger.debug(f"请求参数: {params}")
                 logger.debug(f"请求头: {', '.join([f'{k}: {v[:15]}...' if k == 'Authorization' else f'{k}: {v}' for k, v in headers.items()])}")
                 
-                response = requests.get(url, headers=headers, params=params, timeout=timeout)
+                response = self.session.get(url, headers=headers, params=params, timeout=timeout)
                 
                 # 记录HTTP状态码和响应头
                 logger.info(f"API响应状态码: {response.status_code}")
@@ -237,7 +512,7 @@ class BaseDownloader(ABC):
                 if response.status_code != 200:
                     error_message = f"API请求失败，状态码: {response.status_code}"
                     try:
-                        error_data = response.json()
+                        error_data = self._response_json(response)
                         error_message += f", 错误信息: {error_data.get('message', '未知错误')}"
                         logger.debug(f"错误响应JSON: {error_data}")
                     except Exception as json_error:
@@ -267,12 +542,12 @@ class BaseDownloader(ABC):
                             logger.debug(f"尝试直接请求完整URL: {full_url}")
                             
                             # 直接请求完整URL
-                            response = requests.get(full_url, headers=headers, timeout=timeout)
+                            response = self.session.get(full_url, headers=headers, timeout=timeout)
                             
                             if response.status_code == 200:
                                 logger.info("使用完整URL成功获取响应")
                                 try:
-                                    result = response.json()
+                                    result = self._response_json(response)
                                     return result
                                 except json.JSONDecodeError:
                                     logger.error("解析JSON响应失败")
@@ -288,7 +563,7 @@ class BaseDownloader(ABC):
                 
                 # 尝试解析JSON响应
                 try:
-                    result = response.json()
+                    result = self._response_json(response)
                     
                     # 确保响应是字典类型
                     if not isinstance(result, dict):
@@ -1,34 +1,20 @@
 import os
 import re
-import json
-import time
 import datetime
 import subprocess
 import platform
 import shutil
-from downloaders.base import BaseDownloader
-from utils import setup_logger, create_debug_dir
+from downloaders.base import BaseDownloader, _Trunc, _debug_dir, _FILE_SEQ
+from utils import setup_logger, resolve_path
 
 # 创建日志记录器
 logger = setup_logger("bilibili_downloader")
-# 创建调试目录
-DEBUG_DIR = create_debug_dir()
 
 class BilibiliDownloader(BaseDownloader):
     """
     Bilibili视频下载器
     """
-    def can_handle(self, url):
-        """
-        判断是否可以处理该URL
-        
-        参数:
-            url: 视频URL
-            
-        返回:
-            bool: 是否可以处理
-        """
-        return "bilibili.com" in url or "b23.tv" in url
+    DOMAINS = frozenset({"bilibili.com", "b23.tv"})
     
     def _extract_video_id(self, url):
         """
@@ -41,7 +27,8 @@ class BilibiliDownloader(BaseDownloader):
             str: 视频BV号
         """
         # 解析短链接
-        if "b23.tv" in url:
+        host = self.get_host(url)
+        if self.host_matches(host, "b23.tv"):
             url = self.resolve_short_url(url)
         
         # 提取BV号
@@ -82,19 +69,12 @@ class BilibiliDownloader(BaseDownloader):
             bbdown_config = self.config.get("bbdown", {})
             system_platform = platform.system().lower()
             
-            # 获取当前工作目录
-            current_dir = os.path.abspath(os.getcwd())
-            
             if system_platform == "windows":
                 bbdown_path = bbdown_config.get("executable", "BBDown/BBDown.exe")
-                # 将相对路径转换为绝对路径
-                if not os.path.isabs(bbdown_path):
-                    bbdown_path = os.path.join(current_dir, bbdown_path)
             else:
                 bbdown_path = bbdown_config.get("executable_linux", "BBDown/BBDown")
-                # 将相对路径转换为绝对路径
-                if not os.path.isabs(bbdown_path):
-                    bbdown_path = os.path.join(current_dir, bbdown_path)
+            # 相对路径以项目根目录为基准，与启动时的工作目录无关
+            bbdown_path = resolve_path(bbdown_path)
             
             # 检查BBDown可执行文件是否存在
             if not os.path.exists(bbdown_path):
@@ -105,7 +85,7 @@ class BilibiliDownloader(BaseDownloader):
             audio_only = bbdown_config.get("audio_only", True)
             
             # 创建临时工作目录
-            temp_dir = os.path.join(self.temp_dir, f"bbdown_{bv_id}_{int(time.time())}")
+            temp_dir = os.path.join(self.temp_dir, f"bbdown_{bv_id}_{next(_FILE_SEQ)}")
             os.makedirs(temp_dir, exist_ok=True)
             
             # 在Windows上，使用完整的命令字符串
@@ -215,7 +195,7 @@ class BilibiliDownloader(BaseDownloader):
                     logger.warning(f"文件名为空，使用默认值作为标题: {video_title}")
             
             # 移动文件到临时目录
-            target_filename = f"bilibili_{bv_id}_{int(time.time())}.{file_ext}"
+            target_filename = f"bilibili_{bv_id}_{next(_FILE_SEQ)}.{file_ext}"
             target_path = os.path.join(self.temp_dir, target_filename)
             shutil.move(latest_file, target_path)
             
@@ -266,8 +246,8 @@ class BilibiliDownloader(BaseDownloader):
             logger.info(f"调用TikHub API获取Bilibili视频信息: bv_id={bv_id}")
             response = self.make_api_request(endpoint, params)
             
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
+            # 生成调试文件路径前缀
+            debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
             
             # 记录API响应摘要，帮助调试
             if isinstance(response, dict):
@@ -276,9 +256,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.info(f"API响应状态: {response_code}, 消息: {response_msg}")
                 
                 # 保存完整响应到文件，用于调试
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_bilibili_{bv_id}.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                debug_file = f"{debug_prefix}_debug_bilibili_{bv_id}.json"
+                self._write_debug(debug_file, response)
                 logger.debug(f"API完整响应已保存到: {debug_file}")
             
             # 检查响应格式并提供详细错误信息
@@ -292,9 +271,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.error(f"API返回错误代码: {response.get('code')}, 错误信息: {error_msg}")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_bilibili_{bv_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_bilibili_{bv_id}.json"
+                self._write_error(error_file, response)
                 logger.debug(f"错误响应已保存到: {error_file}")
                 
                 raise ValueError(f"获取Bilibili视频信息失败: {error_msg}")
@@ -311,11 +289,10 @@ class BilibiliDownloader(BaseDownloader):
                 logger.error("无法获取视频详情数据")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_data_bilibili_{bv_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_data_bilibili_{bv_id}.json"
+                self._write_error(error_file, response)
                     
-                logger.debug(f"API完整响应: {json.dumps(response, ensure_ascii=False)[:500]}...")
+                self._log_response_preview(logger, response)
                 raise ValueError("获取视频详情失败，API返回数据结构不符合预期")
             
             # 视频标题
@@ -325,7 +302,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.warning(f"未找到视频标题，使用ID作为标题: {video_title}")
             
             # 视频作者
-            author = data.get("owner", {}).get("name", "未知作者")
+            owner = data.get("owner")
+            author = owner.get("name", "未知作者") if owner else "未知作者"
             
             logger.info(f"获取到视频信息: 标题='{video_title}', 作者='{author}'")
             
@@ -342,8 +320,8 @@ class BilibiliDownloader(BaseDownloader):
             logger.info(f"调用TikHub API获取Bilibili视频播放地址: bv_id={bv_id}, cid={cid}")
             playurl_response = self.make_api_request(endpoint, params)
             
-            # 更新时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
+            # 更新调试文件路径前缀
+            debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
             
             # 记录API响应摘要
             if isinstance(playurl_response, dict):
@@ -352,9 +330,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.info(f"播放地址API响应状态: {response_code}, 消息: {response_msg}")
                 
                 # 保存完整响应到文件
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_bilibili_playurl_{bv_id}.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(playurl_response, f, ensure_ascii=False, indent=2)
+                debug_file = f"{debug_prefix}_debug_bilibili_playurl_{bv_id}.json"
+                self._write_debug(debug_file, playurl_response)
                 logger.debug(f"播放地址API完整响应已保存到: {debug_file}")
             
             # 检查响应格式
@@ -368,9 +345,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.error(f"获取播放地址API返回错误代码: {playurl_response.get('code')}, 错误信息: {error_msg}")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_bilibili_playurl_{bv_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(playurl_response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_bilibili_playurl_{bv_id}.json"
+                self._write_error(error_file, playurl_response)
                 logger.debug(f"播放地址错误响应已保存到: {error_file}")
                 
                 raise ValueError(f"获取Bilibili视频播放地址失败: {error_msg}")
@@ -382,9 +358,8 @@ class BilibiliDownloader(BaseDownloader):
                 logger.error("播放地址API响应中缺少data.data字段")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_playurl_data_bilibili_{bv_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(playurl_response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_playurl_data_bilibili_{bv_id}.json"
+                self._write_error(error_file, playurl_response)
                     
                 raise ValueError("播放地址API响应数据格式错误，缺少必要字段")
             
@@ -392,26 +367,25 @@ class BilibiliDownloader(BaseDownloader):
             download_url = None
             file_ext = "mp4"  # 默认扩展名
             
-            if playurl_data.get("dash") and playurl_data["dash"].get("audio"):
-                audio_list = playurl_data["dash"]["audio"]
-                if audio_list and len(audio_list) > 0:
-                    download_url = audio_list[0].get("baseUrl")
-                    file_ext = "m4s"  # B站音频格式通常为m4s
-                    logger.info(f"找到音频下载URL: {download_url[:50]}...")
+            try:
+                download_url = playurl_data["dash"]["audio"][0]["baseUrl"]
+            except (KeyError, IndexError, TypeError):
+                download_url = None
+            
+            if download_url:
+                file_ext = "m4s"  # B站音频格式通常为m4s
+                logger.info("找到音频下载URL: %s...", _Trunc(download_url, 50))
             
             if not download_url:
                 logger.error("无法获取Bilibili视频下载地址")
                 
                 # 保存错误数据到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_no_download_url_bilibili_{bv_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(playurl_data, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_no_download_url_bilibili_{bv_id}.json"
+                self._write_error(error_file, playurl_data)
                     
                 raise ValueError(f"无法获取Bilibili视频下载地址: {url}")
             
-            # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
-            filename = f"bilibili_{bv_id}_{int(time.time())}.{file_ext}"
+            filename = f"bilibili_{bv_id}_{next(_FILE_SEQ)}.{file_ext}"
             
             result = {
                 "video_id": bv_id,
@@ -470,12 +444,13 @@ class BilibiliDownloader(BaseDownloader):
         # 调用父类方法下载文件
         return super().download_file(url, filename)
     
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         """
         获取字幕，B站API目前不支持直接获取字幕，返回None
         
         参数:
             url: 视频URL
+            video_info: 已获取的视频信息，传入时不再重复请求
             
         返回:
             str: 字幕文本，B站API目前返回None
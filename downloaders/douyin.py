@@ -1,31 +1,20 @@
 import os
 import re
-import json
-import time
 import datetime
-from downloaders.base import BaseDownloader
-from utils import setup_logger, create_debug_dir
+from downloaders.base import BaseDownloader, _Trunc, _debug_dir, _FILE_SEQ
+from utils import setup_logger
 
 # 创建日志记录器
 logger = setup_logger("douyin_downloader")
-# 创建调试目录
-DEBUG_DIR = create_debug_dir()
+# 视频ID提取模式：标准URL、笔记、查询参数优先，都不匹配时再取路径末尾的数字
+_AWEME_ID_RE = re.compile(r'(?:video/|note/|aweme_id=)(\d+)')
+_AWEME_ID_TAIL_RE = re.compile(r'/(\d+)(?:\?|$)')
 
 class DouyinDownloader(BaseDownloader):
     """
     抖音视频下载器
     """
-    def can_handle(self, url):
-        """
-        判断是否可以处理该URL
-        
-        参数:
-            url: 视频URL
-            
-        返回:
-            bool: 是否可以处理
-        """
-        return "douyin.com" in url or "v.douyin.com" in url
+    DOMAINS = frozenset({"douyin.com", "iesdouyin.com"})
     
     def extract_video_id(self, url):
         """
@@ -49,25 +38,18 @@ class DouyinDownloader(BaseDownloader):
             str: 视频ID
         """
         # 解析短链接
-        if "v.douyin.com" in url:
+        host = self.get_host(url)
+        if host == "v.douyin.com":
             logger.info(f"解析抖音短链接: {url}")
             url = self.resolve_short_url(url)
             logger.info(f"解析后的完整链接: {url}")
         
-        # 尝试多种模式提取视频ID
-        patterns = [
-            r'video/(\d+)',      # 标准URL模式
-            r'note/(\d+)',       # 笔记模式
-            r'aweme_id=(\d+)',   # 查询参数模式
-            r'/(\d+)(?:\?|$)'    # 路径末尾模式
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                aweme_id = match.group(1)
-                logger.info(f"从URL中提取到抖音视频ID: {aweme_id}")
-                return aweme_id
+        # 按优先级匹配，路径末尾模式只作为兜底
+        match = _AWEME_ID_RE.search(url) or _AWEME_ID_TAIL_RE.search(url)
+        if match:
+            aweme_id = match.group(1)
+            logger.info(f"从URL中提取到抖音视频ID: {aweme_id}")
+            return aweme_id
         
         logger.error(f"无法从URL中提取抖音视频ID: {url}")
         raise ValueError(f"无法从URL中提取抖音视频ID: {url}")
@@ -93,8 +75,8 @@ class DouyinDownloader(BaseDownloader):
             logger.info(f"调用TikHub API获取抖音视频信息: aweme_id={aweme_id}")
             response = self.make_api_request(endpoint, params)
             
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
+            # 生成调试文件路径前缀
+            debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
             
             # 记录API响应摘要，帮助调试
             if isinstance(response, dict):
@@ -103,9 +85,8 @@ class DouyinDownloader(BaseDownloader):
                 logger.info(f"API响应状态: {response_code}, 消息: {response_msg}")
                 
                 # 保存完整响应到文件，用于调试
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_douyin_{aweme_id}.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                debug_file = f"{debug_prefix}_debug_douyin_{aweme_id}.json"
+                self._write_debug(debug_file, response)
                 logger.debug(f"API完整响应已保存到: {debug_file}")
             
             # 检查响应格式并提供详细错误信息
@@ -119,9 +100,8 @@ class DouyinDownloader(BaseDownloader):
                 logger.error(f"API返回错误代码: {response.get('code')}, 错误信息: {error_msg}")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_douyin_{aweme_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_douyin_{aweme_id}.json"
+                self._write_error(error_file, response)
                 logger.debug(f"错误响应已保存到: {error_file}")
                 
                 raise ValueError(f"获取抖音视频信息失败: {error_msg}")
@@ -137,12 +117,11 @@ class DouyinDownloader(BaseDownloader):
             if not data:
                 logger.error("无法获取视频详情数据: aweme_detail为空")
                 # 记录完整响应以帮助调试
-                logger.debug(f"API完整响应: {json.dumps(response, ensure_ascii=False)[:500]}...")
+                self._log_response_preview(logger, response)
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_data_douyin_{aweme_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_data_douyin_{aweme_id}.json"
+                self._write_error(error_file, response)
                     
                 raise ValueError("获取视频详情失败，API返回数据结构不符合预期")
             
@@ -153,7 +132,8 @@ class DouyinDownloader(BaseDownloader):
                 logger.warning(f"未找到视频标题，使用ID作为标题: {video_title}")
             
             # 视频作者
-            author = data.get("author", {}).get("nickname", "未知作者")
+            author_info = data.get("author")
+            author = author_info.get("nickname", "未知作者") if author_info else "未知作者"
             
             logger.info(f"获取到视频信息: 标题='{video_title}', 作者='{author}'")
             
@@ -163,11 +143,13 @@ class DouyinDownloader(BaseDownloader):
             
             # 首先尝试获取音频文件
             try:
-                audio_url = data.get("music", {}).get("play_url", {}).get("uri")
+                music = data.get("music")
+                play_url = music.get("play_url") if music else None
+                audio_url = play_url.get("uri") if play_url else None
                 if audio_url:
                     download_url = audio_url
                     file_ext = "mp3"
-                    logger.info(f"找到音频下载URL (music.play_url.uri): {audio_url[:50]}...")
+                    logger.info("找到音频下载URL (music.play_url.uri): %s...", _Trunc(audio_url, 50))
             except Exception as audio_error:
                 logger.warning(f"获取音频URL时出现异常: {str(audio_error)}")
             
@@ -176,13 +158,14 @@ class DouyinDownloader(BaseDownloader):
                 logger.info("未找到音频下载URL，尝试获取视频URL")
                 try:
                     # 尝试获取play_addr
-                    play_addr = data.get("video", {}).get("play_addr", {})
-                    url_list = play_addr.get("url_list", [])
+                    video = data.get("video")
+                    play_addr = video.get("play_addr") if video else None
+                    url_list = play_addr.get("url_list") if play_addr else None
                     
                     if url_list and len(url_list) > 0:
                         download_url = url_list[0]
                         file_ext = "mp4"
-                        logger.info(f"找到视频下载URL (video.play_addr.url_list): {download_url[:50]}...")
+                        logger.info("找到视频下载URL (video.play_addr.url_list): %s...", _Trunc(download_url, 50))
                 except Exception as video_error:
                     logger.warning(f"获取视频URL时出现异常: {str(video_error)}")
             
@@ -210,7 +193,7 @@ class DouyinDownloader(BaseDownloader):
                         if current and isinstance(current, list) and len(current) > 0:
                             download_url = current[0]
                             file_ext = "mp4"
-                            logger.info(f"从备选路径 {'.'.join(path)} 找到下载URL: {download_url[:50]}...")
+                            logger.info("从备选路径 %s 找到下载URL: %s...", ".".join(path), _Trunc(download_url, 50))
                             break
                     except Exception:
                         continue
@@ -219,15 +202,12 @@ class DouyinDownloader(BaseDownloader):
                 logger.error("尝试所有方法后仍无法获取下载URL")
                 
                 # 保存错误数据到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_url_douyin_{aweme_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_url_douyin_{aweme_id}.json"
+                self._write_error(error_file, data)
                     
                 raise ValueError(f"无法获取抖音视频下载地址: {url}")
             
-            # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
-            filename = f"douyin_{aweme_id}_{int(time.time())}.{file_ext}"
+            filename = f"douyin_{aweme_id}_{next(_FILE_SEQ)}.{file_ext}"
             
             result = {
                 "video_id": aweme_id,
@@ -245,12 +225,13 @@ class DouyinDownloader(BaseDownloader):
             logger.exception(f"获取抖音视频信息异常: {str(e)}")
             raise
     
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         """
         获取字幕，抖音视频通常没有字幕，返回None
         
         参数:
             url: 视频URL
+            video_info: 已获取的视频信息，传入时不再重复请求
             
         返回:
             str: 字幕文本，抖音通常返回None
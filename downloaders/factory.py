@@ -1,3 +1,4 @@
+from downloaders.base import BaseDownloader
 from downloaders.douyin import DouyinDownloader
 from downloaders.bilibili import BilibiliDownloader
 from downloaders.xiaohongshu import XiaohongshuDownloader
@@ -7,6 +8,30 @@ from utils import setup_logger
 # 创建日志记录器
 logger = setup_logger("downloader_factory")
 
+# 域名到下载器类的映射，由各下载器的DOMAINS生成，子域名通过逐级去掉前缀查找
+_HOST_TO_CLS = {
+    domain: cls
+    for cls in (DouyinDownloader, BilibiliDownloader, XiaohongshuDownloader, YoutubeDownloader)
+    for domain in cls.DOMAINS
+}
+
+def _find_downloader_class(host):
+    """
+    根据主机名查找下载器类
+    
+    参数:
+        host: 小写主机名
+        
+    返回:
+        BaseDownloader的子类，如果没有匹配则返回None
+    """
+    while host:
+        cls = _HOST_TO_CLS.get(host)
+        if cls is not None:
+            return cls
+        _, _, host = host.partition(".")
+    return None
+
 def create_downloader(url):
     """
     根据URL创建对应的下载器
@@ -17,17 +42,11 @@ def create_downloader(url):
     返回:
         BaseDownloader的子类实例，如果没有匹配的下载器则返回None
     """
-    downloaders = [
-        DouyinDownloader(),
-        BilibiliDownloader(),
-        XiaohongshuDownloader(),
-        YoutubeDownloader()
-    ]
-    
-    for downloader in downloaders:
-        if downloader.can_handle(url):
-            logger.info(f"为URL创建下载器: {url}, 类型: {downloader.__class__.__name__}")
-            return downloader
+    # 按主机名直接查表，只实例化匹配的下载器
+    downloader_class = _find_downloader_class(BaseDownloader.get_host(url))
+    if downloader_class is not None:
+        logger.info(f"为URL创建下载器: {url}, 类型: {downloader_class.__name__}")
+        return downloader_class()
     
     logger.error(f"没有找到匹配的下载器: {url}")
     return None 
\ No newline at end of file
@@ -1,31 +1,28 @@
 import os
 import re
-import json
 import time
 import datetime
-from downloaders.base import BaseDownloader
-from utils import setup_logger, create_debug_dir
+from downloaders.base import BaseDownloader, _Trunc, _debug_dir, _FILE_SEQ
+from utils import setup_logger
 
 # 创建日志记录器
 logger = setup_logger("xiaohongshu_downloader")
-# 创建调试目录
-DEBUG_DIR = create_debug_dir()
+
+# 笔记ID提取模式，按优先级排列
+_NOTE_ID_PATTERNS = [
+    re.compile(r'explore/(\w+)'),          # 旧版URL格式
+    re.compile(r'discovery/item/(\w+)'),   # 新版URL格式
+    re.compile(r'items/(\w+)'),            # 另一种可能的格式
+    re.compile(r'/(\w{24})')               # 通用格式，匹配24位的ID
+]
+# 直接提供的笔记ID
+_NOTE_ID_FULL = re.compile(r'^\w{24}$')
 
 class XiaohongshuDownloader(BaseDownloader):
     """
     小红书视频下载器
     """
-    def can_handle(self, url):
-        """
-        判断是否可以处理该URL
-        
-        参数:
-            url: 视频URL
-            
-        返回:
-            bool: 是否可以处理
-        """
-        return "xiaohongshu.com" in url or "xhslink.com" in url
+    DOMAINS = frozenset({"xiaohongshu.com", "xhslink.com"})
     
     def extract_note_id(self, url):
         """
@@ -50,28 +47,22 @@ class XiaohongshuDownloader(BaseDownloader):
             str: 笔记ID
         """
         # 解析短链接
-        if "xhslink.com" in url:
+        host = self.get_host(url)
+        if self.host_matches(host, "xhslink.com"):
             logger.info(f"解析小红书短链接: {url}")
             url = self.resolve_short_url(url)
             logger.info(f"解析后的完整链接: {url}")
         
         # 尝试多种模式提取笔记ID
-        patterns = [
-            r'explore/(\w+)',          # 旧版URL格式
-            r'discovery/item/(\w+)',   # 新版URL格式
-            r'items/(\w+)',            # 另一种可能的格式
-            r'/(\w{24})'               # 通用格式，匹配24位的ID
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in _NOTE_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 note_id = match.group(1)
                 logger.info(f"从URL中提取到小红书笔记ID: {note_id}")
                 return note_id
         
         # 如果用户直接提供了ID，尝试验证其格式
-        if re.match(r'^\w{24}$', url):
+        if _NOTE_ID_FULL.match(url):
             logger.info(f"用户直接提供了小红书笔记ID: {url}")
             return url
         
@@ -114,8 +105,8 @@ class XiaohongshuDownloader(BaseDownloader):
             logger.info(f"调用TikHub API v3获取小红书笔记信息: url={url}")
             response = self.make_api_request(endpoint, params)
             
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
+            # 生成调试文件路径前缀
+            debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
             
             # 记录API响应摘要，帮助调试
             if isinstance(response, dict):
@@ -124,9 +115,8 @@ class XiaohongshuDownloader(BaseDownloader):
                 logger.info(f"API响应状态: {response_code}, 消息: {response_msg}")
                 
                 # 保存完整响应到文件，用于调试
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_xiaohongshu_v3.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                debug_file = f"{debug_prefix}_debug_xiaohongshu_v3.json"
+                self._write_debug(debug_file, response)
                 logger.debug(f"API完整响应已保存到: {debug_file}")
             
             # 检查响应格式并提供详细错误信息
@@ -140,9 +130,8 @@ class XiaohongshuDownloader(BaseDownloader):
                 logger.error(f"API返回错误代码: {response.get('code')}, 错误信息: {error_msg}")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_xiaohongshu_v3.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_xiaohongshu_v3.json"
+                self._write_error(error_file, response)
                 logger.debug(f"错误响应已保存到: {error_file}")
                 
                 raise ValueError(f"获取小红书笔记信息失败: {error_msg}")
@@ -168,29 +157,27 @@ class XiaohongshuDownloader(BaseDownloader):
                 logger.warning(f"未找到视频标题，使用ID作为标题: {video_title}")
             
             # 视频作者
-            author = data.get("user", {}).get("nickname", "未知作者")
+            user = data.get("user")
+            author = user.get("nickname", "未知作者") if user else "未知作者"
             
             logger.info(f"获取到视频信息: 标题='{video_title}', 作者='{author}'")
             
-            # 解析视频URL
-            video_url = None
-            
             # 从新版API中获取视频URL
-            video = data.get("video", {})
-            if video and video.get("media", {}).get("stream", {}).get("h264"):
-                h264_streams = video.get("media", {}).get("stream", {}).get("h264", [])
-                if h264_streams and len(h264_streams) > 0 and h264_streams[0].get("backup_urls"):
-                    video_url = h264_streams[0].get("backup_urls", [])[0]
-                    logger.info(f"从v3 API中找到视频URL: {video_url[:50]}...")
+            try:
+                video_url = data["video"]["media"]["stream"]["h264"][0]["backup_urls"][0]
+            except (KeyError, IndexError, TypeError):
+                video_url = None
+            
+            if video_url:
+                logger.info("从v3 API中找到视频URL: %s...", _Trunc(video_url, 50))
             
             # 检查是否有可用的视频URL
             if not video_url:
                 logger.error(f"无法从新版API获取视频链接: {url}")
                 
                 # 保存错误数据到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_video_url_xiaohongshu_v3.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_video_url_xiaohongshu_v3.json"
+                self._write_error(error_file, data)
                     
                 raise ValueError(f"小红书笔记可能不是视频类型或无法获取视频链接: {url}")
             
@@ -202,9 +189,7 @@ class XiaohongshuDownloader(BaseDownloader):
                 note_id = f"unknown_{int(time.time())}"
                 logger.warning(f"无法从URL中提取笔记ID，使用时间戳: {note_id}")
             
-            # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
-            filename = f"xiaohongshu_{note_id}_{int(time.time())}.mp4"
+            filename = f"xiaohongshu_{note_id}_{next(_FILE_SEQ)}.mp4"
             
             result = {
                 "video_id": note_id,
@@ -221,189 +206,13 @@ class XiaohongshuDownloader(BaseDownloader):
             logger.exception(f"使用新版API获取小红书视频信息异常: {str(e)}")
             raise
     
-    def get_video_info_legacy(self, url):
-        """
-        使用旧版API获取视频信息（保留但不使用）
-        
-        参数:
-            url: 视频URL
-            
-        返回:
-            dict: 包含视频信息的字典
-        """
-        try:
-            # 提取笔记ID
-            note_id = self._extract_note_id(url)
-            
-            # 调用API获取视频信息
-            endpoint = f"/api/v1/xiaohongshu/web/get_note_info"
-            params = {"note_id": note_id}
-            
-            logger.info(f"调用TikHub API获取小红书笔记信息: note_id={note_id}")
-            response = self.make_api_request(endpoint, params)
-            
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
-            
-            # 记录API响应摘要，帮助调试
-            if isinstance(response, dict):
-                response_code = response.get("code")
-                response_msg = response.get("message", "无消息")
-                logger.info(f"API响应状态: {response_code}, 消息: {response_msg}")
-                
-                # 保存完整响应到文件，用于调试
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_xiaohongshu_{note_id}.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
-                logger.debug(f"API完整响应已保存到: {debug_file}")
-            
-            # 检查响应格式并提供详细错误信息
-            if not isinstance(response, dict):
-                logger.error(f"API返回格式错误，预期字典，实际: {type(response)}")
-                raise ValueError("API返回格式错误，无法解析响应")
-            
-            # TikHub API成功响应时返回code=200
-            if response.get("code") != 200:
-                error_msg = response.get("message", "未知错误")
-                logger.error(f"API返回错误代码: {response.get('code')}, 错误信息: {error_msg}")
-                
-                # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_xiaohongshu_{note_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
-                logger.debug(f"错误响应已保存到: {error_file}")
-                
-                raise ValueError(f"获取小红书笔记信息失败: {error_msg}")
-            
-            # 检查data字段
-            if not response.get("data") or not isinstance(response.get("data"), dict):
-                logger.error("API响应中缺少data字段或格式不正确")
-                raise ValueError("API响应数据格式错误，缺少必要字段")
-            
-            # 获取笔记详情数据 - 小红书API响应结构已变更
-            data = response.get("data", {})
-            
-            # 检查内层data字段
-            inner_data = data.get("data", {})
-            if not inner_data:
-                logger.error("API响应中缺少内层data字段")
-                
-                # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_data_xiaohongshu_{note_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
-                    
-                logger.debug(f"API完整响应: {json.dumps(response, ensure_ascii=False)[:500]}...")
-                raise ValueError("获取笔记详情失败，API返回数据结构不符合预期")
-            
-            # 获取data.data.data[0]
-            data_list = inner_data.get("data", [])
-            if not data_list or len(data_list) == 0:
-                logger.error("API响应中data.data.data字段为空数组")
-                
-                # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_data_list_xiaohongshu_{note_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
-                    
-                logger.debug(f"API完整响应: {json.dumps(response, ensure_ascii=False)[:500]}...")
-                raise ValueError("获取笔记详情失败，API返回数据结构不符合预期")
-            
-            # 获取第一个笔记数据
-            note_data = data_list[0]
-            
-            # 获取note_list字段
-            note_list_data = note_data.get("note_list", [])
-            if not note_list_data or len(note_list_data) == 0:
-                logger.error("API响应中note_list字段为空数组")
-                
-                # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_note_list_xiaohongshu_{note_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(note_data, f, ensure_ascii=False, indent=2)
-                    
-                logger.debug(f"API完整响应: {json.dumps(response, ensure_ascii=False)[:500]}...")
-                raise ValueError("获取笔记详情失败，API返回数据结构不符合预期")
-            
-            # 获取第一个笔记
-            note = note_list_data[0]
-            
-            # 视频标题
-            video_title = note.get("title", "")
-            if not video_title or video_title.strip() == "":
-                video_title = f"xiaohongshu_{note_id}"
-                logger.warning(f"未找到视频标题，使用ID作为标题: {video_title}")
-            
-            # 视频作者
-            author = note_data.get("user", {}).get("name", "未知作者")
-            
-            logger.info(f"获取到视频信息: 标题='{video_title}', 作者='{author}'")
-            
-            # 检查笔记类型
-            note_type = note.get("type", "")
-            if note_type != "video":
-                logger.warning(f"笔记类型不是视频，而是: {note_type}")
-            
-            # 解析视频信息
-            video_url = None
-            
-            # 1. 从widgets_context中解析视频信息
-            widgets_context = note.get("widgets_context", "{}")
-            try:
-                widgets_data = json.loads(widgets_context)
-                if widgets_data.get("video") and widgets_data.get("note_sound_info"):
-                    sound_info = widgets_data.get("note_sound_info", {})
-                    video_url = sound_info.get("url")
-                    if video_url:
-                        logger.info(f"从widgets_context中找到视频URL: {video_url[:50]}...")
-            except Exception as e:
-                logger.warning(f"解析widgets_context失败: {str(e)}")
-            
-            # 2. 尝试从video字段获取
-            if not video_url:
-                video = note.get("video", {})
-                if video:
-                    video_url = video.get("url")
-                    if video_url:
-                        logger.info(f"从video字段找到视频URL: {video_url[:50]}...")
-            
-            # 3. 检查是否有可用的视频URL
-            if not video_url:
-                logger.error(f"小红书笔记可能不是视频类型或无法获取视频链接: {url}")
-                
-                # 保存错误数据到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_video_url_xiaohongshu_{note_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(note, f, ensure_ascii=False, indent=2)
-                    
-                raise ValueError(f"小红书笔记可能不是视频类型或无法获取视频链接: {url}")
-            
-            # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
-            filename = f"xiaohongshu_{note_id}_{int(time.time())}.mp4"
-            
-            result = {
-                "video_id": note_id,
-                "video_title": video_title,
-                "author": author,
-                "download_url": video_url,
-                "filename": filename,
-                "platform": "xiaohongshu"
-            }
-            
-            logger.info(f"成功获取小红书视频信息: ID={note_id}")
-            return result
-                
-        except Exception as e:
-            logger.exception(f"获取小红书视频信息异常: {str(e)}")
-            raise
-    
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         """
         获取字幕，小红书视频通常没有字幕，返回None
         
         参数:
             url: 视频URL
+            video_info: 已获取的视频信息，传入时不再重复请求
             
         返回:
             str: 字幕文本，小红书通常返回None
@@ -1,33 +1,44 @@
+import io
 import os
-import re
-import json
-import time
+import shutil
+import logging
 import datetime
 import xml.etree.ElementTree as ET
-import requests
-from downloaders.base import BaseDownloader
-from utils import setup_logger, create_debug_dir
+from types import MappingProxyType
+from urllib.parse import urlsplit, parse_qs
+try:
+    from lxml import etree as LET
+except ImportError:  # lxml为可选依赖，缺失时退回标准库ElementTree
+    LET = None
+from downloaders.base import BaseDownloader, _Trunc, _debug_dir, _FILE_SEQ
+from utils import setup_logger
 
 # 创建日志记录器
 logger = setup_logger("youtube_downloader")
-# 创建调试目录
-DEBUG_DIR = create_debug_dir()
+
+# 只读的空字典，响应中缺少字段时作为默认值，避免每次分配新字典
+_EMPTY = MappingProxyType({})
+
+
+class _TeeReader:
+    """
+    包装可读文件对象，读取的数据同时写入另一个文件
+    """
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+    
+    def read(self, size=-1):
+        data = self.source.read(size)
+        self.sink.write(data)
+        return data
+
 
 class YoutubeDownloader(BaseDownloader):
     """
     Youtube视频下载器
     """
-    def can_handle(self, url):
-        """
-        判断是否可以处理该URL
-        
-        参数:
-            url: 视频URL
-            
-        返回:
-            bool: 是否可以处理
-        """
-        return "youtube.com" in url or "youtu.be" in url
+    DOMAINS = frozenset({"youtube.com", "youtu.be"})
     
     def _extract_video_id(self, url):
         """
@@ -40,20 +51,23 @@ class YoutubeDownloader(BaseDownloader):
             str: 视频ID
         """
         # 解析短链接
-        if "youtu.be" in url:
+        host = self.get_host(url)
+        if host == "youtu.be":
             url = self.resolve_short_url(url)
         
-        # 从URL中提取视频ID
-        if "youtube.com/watch" in url:
+        # 从URL中提取视频ID，与get_host一致，不带协议头的URL补上 // 再解析
+        parts = urlsplit(url if "//" in url else "//" + url)
+        host = parts.hostname or ""
+        if self.host_matches(host, "youtube.com") and parts.path == "/watch":
             # 形如 https://www.youtube.com/watch?v=VIDEO_ID
-            match = re.search(r'v=([^&]+)', url)
-            if match:
-                return match.group(1)
-        elif "youtu.be/" in url:
+            video_id = parse_qs(parts.query).get("v", [None])[0]
+            if video_id:
+                return video_id
+        elif host == "youtu.be":
             # 形如 https://youtu.be/VIDEO_ID
-            match = re.search(r'youtu\.be/([^?&]+)', url)
-            if match:
-                return match.group(1)
+            video_id = parts.path.lstrip("/").split("/", 1)[0]
+            if video_id:
+                return video_id
         
         logger.error(f"无法从URL中提取Youtube视频ID: {url}")
         raise ValueError(f"无法从URL中提取Youtube视频ID: {url}")
@@ -79,6 +93,10 @@ class YoutubeDownloader(BaseDownloader):
         返回:
             dict: 包含视频信息的字典
         """
+        # 同一实例中重复获取时直接返回已有结果（如get_subtitle未传入video_info）
+        if url in self._info_cache:
+            return self._info_cache[url]
+        
         try:
             # 提取视频ID
             video_id = self._extract_video_id(url)
@@ -90,8 +108,8 @@ class YoutubeDownloader(BaseDownloader):
             logger.info(f"调用TikHub API获取YouTube视频信息: video_id={video_id}")
             response = self.make_api_request(endpoint, params)
             
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
+            # 生成调试文件路径前缀
+            debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
             
             # 记录API响应摘要，帮助调试
             if isinstance(response, dict):
@@ -100,9 +118,8 @@ class YoutubeDownloader(BaseDownloader):
                 logger.info(f"API响应状态: {response_code}, 消息: {response_msg}")
                 
                 # 保存完整响应到文件，用于调试
-                debug_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_debug_youtube_{video_id}.json")
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                debug_file = f"{debug_prefix}_debug_youtube_{video_id}.json"
+                self._write_debug(debug_file, response)
                 logger.debug(f"API完整响应已保存到: {debug_file}")
             
             # 检查响应格式并提供详细错误信息
@@ -116,9 +133,8 @@ class YoutubeDownloader(BaseDownloader):
                 logger.error(f"API返回错误代码: {response.get('code')}, 错误信息: {error_msg}")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_youtube_{video_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_youtube_{video_id}.json"
+                self._write_error(error_file, response)
                 logger.debug(f"错误响应已保存到: {error_file}")
                 
                 raise ValueError(f"获取YouTube视频信息失败: {error_msg}")
@@ -128,9 +144,8 @@ class YoutubeDownloader(BaseDownloader):
                 logger.error("API响应中缺少data字段或格式不正确")
                 
                 # 保存错误响应到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_data_youtube_{video_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_data_youtube_{video_id}.json"
+                self._write_error(error_file, response)
                 
                 raise ValueError("API响应数据格式错误，缺少必要字段")
             
@@ -144,7 +159,8 @@ class YoutubeDownloader(BaseDownloader):
                 logger.warning(f"未找到视频标题，使用ID作为标题: {video_title}")
             
             # 视频作者
-            author = data.get("channel", {}).get("name", "未知作者")
+            channel = data.get("channel") or _EMPTY
+            author = channel.get("name", "未知作者")
             
             logger.info(f"获取到视频信息: 标题='{video_title}', 作者='{author}'")
             
@@ -152,38 +168,40 @@ class YoutubeDownloader(BaseDownloader):
             download_url = None
             file_ext = "mp4"  # 默认扩展名
             
-            audio_items = data.get("audios", {}).get("items", [])
+            audio_items = (data.get("audios") or _EMPTY).get("items", ())
             
-            if audio_items and len(audio_items) > 0:
+            if audio_items:
                 download_url = audio_items[0].get("url")
                 file_ext = "m4a"  # YouTube音频通常为m4a格式
-                logger.info(f"找到音频下载URL: {download_url[:50]}...")
+                logger.info("找到音频下载URL: %s...", _Trunc(download_url, 50))
             
             if not download_url:
                 logger.error("无法获取YouTube视频音频下载地址")
                 
                 # 保存错误数据到文件
-                error_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_error_no_audio_youtube_{video_id}.json")
-                with open(error_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                error_file = f"{debug_prefix}_error_no_audio_youtube_{video_id}.json"
+                self._write_error(error_file, data)
                 
                 raise ValueError(f"无法获取Youtube视频音频下载地址: {url}")
             
-            # 清理文件名中的非法字符
-            safe_title = re.sub(r'[\\/*?:"<>|]', "_", video_title)
-            filename = f"youtube_{video_id}_{int(time.time())}.{file_ext}"
+            # 生成文件名
+            filename = f"youtube_{video_id}_{next(_FILE_SEQ)}.{file_ext}"
             
             # 获取字幕信息
-            subtitles = data.get("subtitles", {})
+            subtitle_items = (data.get("subtitles") or _EMPTY).get("items", ())
             subtitle_info = None
             
             # 检查字幕数据
-            if subtitles and subtitles.get("items"):
-                subtitle_items = subtitles.get("items", [])
-                
-                # 优先选择中文字幕，其次是英文字幕
-                zh_subtitle = next((item for item in subtitle_items if item.get("code") == "zh"), None)
-                en_subtitle = next((item for item in subtitle_items if item.get("code") == "en"), None)
+            if subtitle_items:
+                # 优先选择中文字幕，其次是英文字幕，一次遍历完成，找到中文即停止
+                zh_subtitle = en_subtitle = None
+                for item in subtitle_items:
+                    code = item.get("code")
+                    if code == "zh":
+                        zh_subtitle = item
+                        break
+                    if code == "en" and en_subtitle is None:
+                        en_subtitle = item
                 
                 subtitle_info = zh_subtitle or en_subtitle
                 
@@ -201,24 +219,27 @@ class YoutubeDownloader(BaseDownloader):
             }
             
             logger.info(f"成功获取YouTube视频信息: ID={video_id}, 文件类型={file_ext}")
+            self._info_cache[url] = result
             return result
                 
         except Exception as e:
             logger.exception(f"获取YouTube视频信息异常: {str(e)}")
             raise
     
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         """
         获取字幕，Youtube视频可能有字幕
         
         参数:
             url: 视频URL
+            video_info: 已获取的视频信息，传入时不再重复请求
             
         返回:
             str: 字幕文本，如果有的话
         """
         try:
-            video_info = self.get_video_info(url)
+            if video_info is None:
+                video_info = self.get_video_info(url)
             subtitle_info = video_info.get("subtitle_info")
             
             if not subtitle_info or not subtitle_info.get("url"):
@@ -228,24 +249,28 @@ class YoutubeDownloader(BaseDownloader):
             # 下载字幕XML
             subtitle_url = subtitle_info["url"]
             
-            logger.info(f"下载YouTube字幕: {subtitle_url[:50]}...")
-            response = requests.get(subtitle_url, timeout=30)
-            response.raise_for_status()
-            
-            xml_content = response.text
-            
-            # 生成时间戳前缀
-            timestamp_prefix = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
-            
-            # 保存字幕XML到文件，用于调试
-            video_id = video_info.get("video_id")
-            subtitle_file = os.path.join(DEBUG_DIR, f"{timestamp_prefix}_subtitle_youtube_{video_id}.xml")
-            with open(subtitle_file, 'w', encoding='utf-8') as f:
-                f.write(xml_content)
-            logger.debug(f"字幕内容已保存到: {subtitle_file}")
-            
-            # 解析XML字幕
-            return self._parse_youtube_subtitle_xml(xml_content)
+            logger.info("下载YouTube字幕: %s...", _Trunc(subtitle_url, 50))
+            with self.session.get(subtitle_url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                # 直接将响应流交给解析器，避免先整体解码为字符串
+                response.raw.decode_content = True
+                
+                if not logger.isEnabledFor(logging.DEBUG):
+                    return self._parse_youtube_subtitle_xml(response.raw)
+                
+                # 生成调试文件路径前缀
+                debug_prefix = os.path.join(_debug_dir(), datetime.datetime.now().strftime("%y%m%d-%H%M%S"))
+                
+                # 解析的同时保存字幕XML到文件，用于调试
+                video_id = video_info.get("video_id")
+                subtitle_file = f"{debug_prefix}_subtitle_youtube_{video_id}.xml"
+                with open(subtitle_file, 'wb') as f:
+                    subtitle = self._parse_youtube_subtitle_xml(_TeeReader(response.raw, f))
+                    # 解析失败时补齐剩余内容，保证调试文件完整
+                    shutil.copyfileobj(response.raw, f)
+                logger.debug(f"字幕内容已保存到: {subtitle_file}")
+                
+                return subtitle
         except Exception as e:
             logger.exception(f"获取Youtube字幕异常: {str(e)}")
             return None
@@ -255,38 +280,59 @@ class YoutubeDownloader(BaseDownloader):
         解析YouTube字幕XML
         
         参数:
-            xml_content: XML字幕内容
+            xml_content: XML字幕内容，可以是字符串、字节或可读的文件对象
             
         返回:
             str: 解析后的字幕文本
         """
         try:
-            root = ET.fromstring(xml_content)
+            if isinstance(xml_content, str):
+                xml_content = xml_content.encode("utf-8")
+            if isinstance(xml_content, bytes):
+                source = io.BytesIO(xml_content)
+            else:
+                source = xml_content
+            
+            # 流式解析，每段字幕读取后立即释放元素；优先使用lxml的C实现，只对text元素触发事件
+            if LET is not None:
+                events = LET.iterparse(source, events=("end",), tag="text", recover=True)
+            else:
+                # ElementTree没有按标签过滤和访问父节点的能力，需要记下根节点以便释放已处理的子元素
+                events = ET.iterparse(source, events=("start", "end"))
             
-            # 提取文本并按时间顺序排序
             texts = []
-            for text_element in root.findall(".//text"):
-                start = float(text_element.get("start", "0"))
-                duration = float(text_element.get("dur", "0"))
-                content = text_element.text or ""
-                
-                texts.append({
-                    "start": start,
-                    "duration": duration,
-                    "content": content.strip()
-                })
-            
-            # 按开始时间排序
-            texts.sort(key=lambda x: x["start"])
-            
-            # 合并字幕文本
-            merged_text = ""
-            for text in texts:
-                if text["content"]:
-                    merged_text += text["content"] + " "
+            in_order = True
+            last_start = 0.0
+            root = None
+            for event, element in events:
+                if event == "start":
+                    if root is None:
+                        root = element
+                    continue
+                if element.tag != "text":
+                    continue
+                start = float(element.get("start", "0"))
+                if start < last_start:
+                    in_order = False
+                last_start = start
+                texts.append((start, (element.text or "").strip()))
+                # 删除已处理的节点，保持内存占用平稳
+                if LET is not None:
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                else:
+                    root.clear()
+            
+            # YouTube字幕本身按时间顺序排列，仅在出现乱序时才排序
+            if not in_order:
+                texts.sort(key=lambda x: x[0])
+            
+            # 合并字幕文本，str.join会先把生成器转成列表，直接传入列表更快
+            merged_text = " ".join([content for _, content in texts if content])
             
             logger.info(f"成功解析YouTube字幕，共{len(texts)}段")
-            return merged_text.strip()
+            return merged_text
         except Exception as e:
             logger.exception(f"解析Youtube字幕XML异常: {str(e)}")
             return None 
\ No newline at end of file
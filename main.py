@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import os
 import sys
 import argparse
 from api import start_server
@@ -24,6 +23,4 @@ def main():
         parser.print_help()
 
 if __name__ == "__main__":
-    # 确保工作目录是项目根目录
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
     main() 
\ No newline at end of file
@@ -11,8 +11,26 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 def run_all_tests():
     """
     运行所有测试用例
+    
+    安装了pytest时用pytest运行，有pytest-xdist时多进程并行；否则退回unittest顺序运行
     """
     tests_dir = os.path.join(os.path.dirname(__file__), 'tests')
+    
+    try:
+        import pytest
+    except ImportError:
+        pytest = None
+    
+    if pytest is not None:
+        args = ["-q", tests_dir]
+        try:
+            import xdist  # noqa: F401
+            # 同一文件中的测试共用临时文件，按文件分配到各个进程
+            args = ["-n", "auto", "--dist", "loadfile"] + args
+        except ImportError:
+            pass
+        return pytest.main(args) == 0
+    
     test_loader = unittest.TestLoader()
     test_suite = test_loader.discover(tests_dir, pattern='test_*.py')
     
@@ -7,14 +7,13 @@
 
 import os
 import sys
-import json
 import argparse
 
 # 添加项目根目录到导入路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils import setup_logger, load_config
-from downloaders.base import BaseDownloader
+from downloaders.base import BaseDownloader, _dump_json
 
 # 创建日志记录器
 logger = setup_logger("test_api")
@@ -22,13 +21,13 @@ logger = setup_logger("test_api")
 class TestAPIDownloader(BaseDownloader):
     """测试API的下载器"""
     
-    def can_handle(self, url):
+    def can_handle(self, url, host=None):
         return True
     
     def get_video_info(self, url):
         pass
     
-    def get_subtitle(self, url):
+    def get_subtitle(self, url, video_info=None):
         return None
     
     def test_api(self, endpoint, params=None):
@@ -102,8 +101,7 @@ def test_douyin_api(aweme_id):
                 
                 # 保存调试信息到JSON文件
                 debug_file = f"debug_douyin_{aweme_id}.json"
-                with open(debug_file, 'w', encoding='utf-8') as f:
-                    json.dump(response, f, ensure_ascii=False, indent=2)
+                _dump_json(debug_file, response)
                 logger.info(f"完整响应已保存到: {debug_file}")
                 
                 return True
@@ -114,8 +112,7 @@ def test_douyin_api(aweme_id):
         
         # 保存完整响应以便调试
         debug_file = f"error_douyin_{aweme_id}.json"
-        with open(debug_file, 'w', encoding='utf-8') as f:
-            json.dump(response, f, ensure_ascii=False, indent=2)
+        _dump_json(debug_file, response)
         logger.info(f"出错响应已保存到: {debug_file}")
         
         return False
@@ -15,7 +15,6 @@ from pathlib import Path
 # 添加项目根目录到系统路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from transcriber import Transcriber
 from utils import setup_logger, load_config, wechat_notify
 
 # 创建日志记录器
@@ -44,6 +43,8 @@ def main():
             wechat_notify(f"开始转录文件: {os.path.basename(file_path)}", config=config)
         
         start_time = time.time()
+        # 参数检查通过后再导入转录器，避免--help等情况加载Client_Only
+        from transcriber import Transcriber
         transcriber = Transcriber(config)
         
         # 执行转录
@@ -92,6 +93,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    # 确保工作目录是项目根目录
-    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     sys.exit(main()) 
\ No newline at end of file
@@ -5,18 +5,49 @@ import os
 import sys
 import argparse
 import json
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
 
 # 添加项目根目录到导入路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils import setup_logger
+from utils import setup_logger, load_config, PROJECT_ROOT
 from downloaders import create_downloader
-from transcriber import Transcriber
 
 # 创建日志记录器
 logger = setup_logger("test_url")
 
+def _print_json(obj):
+    """
+    以缩进格式将结果输出到标准输出，优先使用orjson
+    
+    参数:
+        obj: 要输出的数据
+    """
+    if orjson is not None:
+        # 解码后经print输出，由控制台编码处理中文，避免在Windows控制台直接写入UTF-8字节导致乱码
+        print(orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode())
+    else:
+        print(json.dumps(obj, ensure_ascii=False, indent=2))
+
+def _json_line(obj) -> bytes:
+    """
+    将数据序列化为一行JSON（NDJSON格式），优先使用orjson
+    
+    参数:
+        obj: 要序列化的数据
+        
+    返回:
+        bytes: 以换行结尾的UTF-8编码JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
 def test_single_url(url: str) -> Dict[str, Any]:
     """
     测试单个URL的转录效果
@@ -27,6 +58,24 @@ def test_single_url(url: str) -> Dict[str, Any]:
     返回:
         dict: 包含转录结果的字典
     """
+    result, job = _prepare_url(url)
+    if job is not None:
+        result = _transcribe_job(*job)
+    return result
+
+def _prepare_url(url: str) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+    """
+    获取视频信息和字幕，没有字幕时下载音视频，不进行转录
+    
+    该阶段可以多个URL并发执行；转录阶段共享CapsWriter客户端连接，需逐个执行
+    
+    参数:
+        url: 视频URL
+        
+    返回:
+        tuple: (结果字典, 待转录任务)，待转录任务为 (downloader, video_info, local_file)，
+            无需转录时为None；存在待转录任务时结果字典为None
+    """
     logger.info(f"开始测试URL: {url}")
     
     try:
@@ -35,7 +84,7 @@ def test_single_url(url: str) -> Dict[str, Any]:
         if not downloader:
             error_msg = f"不支持的URL类型: {url}"
             logger.error(error_msg)
-            return {"status": "failed", "message": error_msg}
+            return {"status": "failed", "message": error_msg}, None
         
         # 获取视频信息
         logger.info(f"获取视频信息: {url}")
@@ -43,17 +92,17 @@ def test_single_url(url: str) -> Dict[str, Any]:
         
         # 尝试获取字幕
         logger.info(f"尝试获取字幕: {url}")
-        subtitle = downloader.get_subtitle(url)
+        subtitle = downloader.get_subtitle(url, video_info=video_info)
         
         if subtitle:
             # 如果有字幕，直接使用
             logger.info(f"使用平台提供的字幕: {url}")
             
             # 生成输出文件名
-            output_dir = "./output"
+            output_dir = PROJECT_ROOT / "output"
             os.makedirs(output_dir, exist_ok=True)
             subtitle_filename = f"{video_info.get('platform')}_{video_info.get('video_id')}.txt"
-            subtitle_path = os.path.join(output_dir, subtitle_filename)
+            subtitle_path = str(output_dir / subtitle_filename)
             
             # 保存字幕文件
             with open(subtitle_path, "w", encoding="utf-8") as f:
@@ -80,45 +129,63 @@ def test_single_url(url: str) -> Dict[str, Any]:
             if not download_url or not filename:
                 error_msg = f"无法获取下载信息: {url}"
                 logger.error(error_msg)
-                return {"status": "failed", "message": error_msg}
+                return {"status": "failed", "message": error_msg}, None
             
             # 下载文件
             local_file = downloader.download_file(download_url, filename)
             if not local_file:
                 error_msg = f"下载文件失败: {url}"
                 logger.error(error_msg)
-                return {"status": "failed", "message": error_msg}
+                return {"status": "failed", "message": error_msg}, None
             
-            try:
-                # 开始转录
-                logger.info(f"开始转录音视频: {local_file}")
-                
-                # 生成转录文件名
-                output_base = f"{video_info.get('platform')}_{video_info.get('video_id')}"
-                
-                # 创建转录器并转录
-                transcriber = Transcriber()
-                transcription_result = transcriber.transcribe(local_file, output_base)
-                
-                # 返回结果
-                result = {
-                    "status": "success",
-                    "message": "转录成功",
-                    "data": {
-                        "video_title": video_info.get("video_title", ""),
-                        "author": video_info.get("author", ""),
-                        "transcript": transcription_result.get("transcript", ""),
-                        "srt_path": transcription_result.get("srt_path", ""),
-                        "lrc_path": transcription_result.get("lrc_path", ""),
-                        "json_path": transcription_result.get("json_path", "")
-                    }
-                }
-            finally:
-                # 清理下载的文件
-                logger.info(f"清理下载的文件: {local_file}")
-                downloader.clean_up(local_file)
+            return None, (downloader, video_info, local_file)
         
-        return result
+        return result, None
+    except Exception as e:
+        logger.exception(f"转录处理异常: {str(e)}")
+        return {
+            "status": "failed",
+            "message": f"转录任务异常: {str(e)}",
+            "error": str(e)
+        }, None
+
+def _transcribe_job(downloader, video_info: Dict[str, Any], local_file: str) -> Dict[str, Any]:
+    """
+    转录已下载的音视频文件，结束后清理下载的文件
+    
+    参数:
+        downloader: 下载该文件的下载器
+        video_info: 视频信息
+        local_file: 下载的本地文件路径
+        
+    返回:
+        dict: 包含转录结果的字典
+    """
+    try:
+        # 开始转录
+        logger.info(f"开始转录音视频: {local_file}")
+        
+        # 生成转录文件名
+        output_base = f"{video_info.get('platform')}_{video_info.get('video_id')}"
+        
+        # 创建转录器并转录，转录器按需导入，避免命令行启动时加载Client_Only
+        from transcriber import Transcriber
+        transcriber = Transcriber()
+        transcription_result = transcriber.transcribe(local_file, output_base)
+        
+        # 返回结果
+        return {
+            "status": "success",
+            "message": "转录成功",
+            "data": {
+                "video_title": video_info.get("video_title", ""),
+                "author": video_info.get("author", ""),
+                "transcript": transcription_result.get("transcript", ""),
+                "srt_path": transcription_result.get("srt_path", ""),
+                "lrc_path": transcription_result.get("lrc_path", ""),
+                "json_path": transcription_result.get("json_path", "")
+            }
+        }
     except Exception as e:
         logger.exception(f"转录处理异常: {str(e)}")
         return {
@@ -126,6 +193,10 @@ def test_single_url(url: str) -> Dict[str, Any]:
             "message": f"转录任务异常: {str(e)}",
             "error": str(e)
         }
+    finally:
+        # 清理下载的文件
+        logger.info(f"清理下载的文件: {local_file}")
+        downloader.clean_up(local_file)
 
 def test_url_list(url_list_file: str, output_file: str = None) -> List[Dict[str, Any]]:
     """
@@ -133,7 +204,7 @@ def test_url_list(url_list_file: str, output_file: str = None) -> List[Dict[str,
     
     参数:
         url_list_file: URL列表文件路径，每行一个URL
-        output_file: 输出结果的JSON文件路径，如果为None则不输出文件
+        output_file: 输出结果的NDJSON文件路径（每行一个结果，完成一个写入一个），如果为None则不输出文件
         
     返回:
         list: 包含所有URL测试结果的列表
@@ -146,19 +217,29 @@ def test_url_list(url_list_file: str, output_file: str = None) -> List[Dict[str,
     
     logger.info(f"共读取到 {len(urls)} 个URL")
     
-    # 测试每个URL
+    # 信息获取和下载并发执行，转录在当前线程按输入顺序逐个进行，
+    # 避免多个线程同时使用CapsWriter客户端共享的websocket连接；结果保持与输入相同的顺序
+    max_workers = load_config().get("concurrent", {}).get("test_concurrency", 8)
     results = []
-    for i, url in enumerate(urls, 1):
-        logger.info(f"测试进度: {i}/{len(urls)}")
-        result = test_single_url(url)
-        result["url"] = url
-        results.append(result)
-    
-    # 输出结果到文件
-    if output_file:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        logger.info(f"测试结果已保存至: {output_file}")
+    # 结果逐行写入文件，中途异常退出时已完成的结果不会丢失
+    output = open(output_file, "wb") if output_file else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_prepare_url, url) for url in urls]
+            for i, (url, future) in enumerate(zip(urls, futures), 1):
+                result, job = future.result()
+                if job is not None:
+                    result = _transcribe_job(*job)
+                result["url"] = url
+                results.append(result)
+                if output is not None:
+                    output.write(_json_line(result))
+                    output.flush()
+                logger.info(f"测试进度: {i}/{len(urls)}")
+    finally:
+        if output is not None:
+            output.close()
+            logger.info(f"测试结果已保存至: {output_file}")
     
     return results
 
@@ -184,7 +265,8 @@ def test_audio_file(file_path: str) -> Dict[str, Any]:
         # 获取文件名（不包含扩展名）
         file_base = os.path.splitext(os.path.basename(file_path))[0]
         
-        # 创建转录器并转录
+        # 创建转录器并转录，转录器按需导入，避免命令行启动时加载Client_Only
+        from transcriber import Transcriber
         transcriber = Transcriber()
         transcription_result = transcriber.transcribe(file_path, file_base)
         
@@ -223,7 +305,7 @@ def main():
     # URL列表测试子命令
     url_list_parser = subparsers.add_parser("url_list", help="测试URL列表")
     url_list_parser.add_argument("url_list_file", help="URL列表文件路径，每行一个URL")
-    url_list_parser.add_argument("-o", "--output", help="输出结果的JSON文件路径")
+    url_list_parser.add_argument("-o", "--output", help="输出结果的NDJSON文件路径，每行一个JSON结果")
     
     # 音频文件测试子命令
     audio_parser = subparsers.add_parser("audio", help="测试音频文件")
@@ -234,12 +316,12 @@ def main():
     
     if args.command == "url":
         result = test_single_url(args.url)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        _print_json(result)
     elif args.command == "url_list":
         test_url_list(args.url_list_file, args.output)
     elif args.command == "audio":
         result = test_audio_file(args.file_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+        _print_json(result)
     else:
         parser.print_help()
 
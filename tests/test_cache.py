@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import unittest
+
+# 添加项目根目录到导入路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest.mock import patch
+from utils import logger as logger_module
+from utils.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """测试TTL缓存"""
+    
+    def test_get_set(self):
+        """测试写入和读取"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("b", "默认值"), "默认值")
+    
+    def test_expire(self):
+        """测试条目过期"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+    
+    def test_evict_least_recently_used(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+
+class TestLoadConfig(unittest.TestCase):
+    """测试配置文件缓存"""
+    
+    def setUp(self):
+        """创建临时配置文件"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.temp_dir.name, "config.json")
+        self._write_config({"version": 1}, mtime=1000)
+        patcher = patch.object(logger_module, "CONFIG_FILE", self.config_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        logger_module.load_config.cache_clear()
+        self.addCleanup(logger_module.load_config.cache_clear)
+    
+    def tearDown(self):
+        """清理临时文件"""
+        self.temp_dir.cleanup()
+    
+    def _write_config(self, data, mtime):
+        with open(self.config_file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.utime(self.config_file, (mtime, mtime))
+    
+    def test_cached_until_modified(self):
+        """测试文件未变化时复用解析结果，修改后重新加载"""
+        first = logger_module.load_config()
+        self.assertIs(logger_module.load_config(), first)
+        
+        self._write_config({"version": 2}, mtime=2000)
+        self.assertEqual(logger_module.load_config()["version"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
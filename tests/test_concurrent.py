@@ -7,13 +7,29 @@
 
 import asyncio
 import aiohttp
+import random
 import time
 import json
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+# 请求/响应JSON编解码，优先使用orjson
+if orjson is not None:
+    json_loads = orjson.loads
+    json_dumps = lambda obj: orjson.dumps(obj).decode("utf-8")
+else:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
 # 配置
 API_BASE_URL = "http://localhost:8000"
 AUTH_TOKEN = "x"  # 请替换为实际的token
+# 认证请求头，挂在会话上供所有请求共用
+AUTH_HEADERS = {"Authorization": f"Bearer {AUTH_TOKEN}"}
 
 # 测试视频URL列表
 TEST_URLS = [
@@ -22,21 +38,66 @@ TEST_URLS = [
     # 可以添加更多测试URL
 ]
 
+# 连接池配置：单主机连接数与并发规模匹配，保持空闲连接以复用
+MAX_CONNECTIONS_PER_HOST = 64
+KEEPALIVE_TIMEOUT = 75
+
+# 状态轮询间隔：指数退避，状态变化时重置
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 15.0
+POLL_BACKOFF = 1.5
+POLL_JITTER = 0.5
+# 每组并发查询的任务数
+POLL_BATCH_SIZE = 32
+
+# 任务结束状态
+FINAL_STATUSES = ("success", "failed", "error")
+
+# 监控超时：单个任务的预估上限，整批超时按任务数累加并留出余量
+MONITOR_TASK_TIMEOUT = 600
+MONITOR_TIMEOUT_BUFFER = 60
+# 批量提交的整体超时
+SUBMIT_BATCH_TIMEOUT = 120
+
+def create_session():
+    """创建共享的HTTP会话，统一携带认证头、连接池和超时配置"""
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=AUTH_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=30, connect=5),
+        json_serialize=json_dumps
+    )
+
+async def run_all(coros, timeout=None):
+    """
+    并发运行一组协程并按提交顺序返回结果
+    
+    任一协程抛出异常或整体超时时，取消其余仍在运行的协程，
+    效果与asyncio.TaskGroup一致，同时兼容Python 3.8+
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
 async def submit_task(session, url, task_name):
     """提交转录任务"""
-    headers = {
-        "Authorization": f"Bearer {AUTH_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
     data = {"url": url}
     
     try:
         start_time = time.time()
         async with session.post(f"{API_BASE_URL}/api/transcribe", 
-                               headers=headers, 
                                json=data) as response:
-            result = await response.json()
+            result = await response.json(loads=json_loads)
             submit_time = time.time() - start_time
             
             if response.status == 202:
@@ -52,48 +113,91 @@ async def submit_task(session, url, task_name):
         return None
 
 async def check_task_status(session, task_id, task_name):
-    """检查任务状态"""
-    headers = {
-        "Authorization": f"Bearer {AUTH_TOKEN}",
-    }
-    
+    """检查任务状态，返回状态、消息及服务端建议的重试间隔（秒）"""
     try:
-        async with session.get(f"{API_BASE_URL}/api/task/{task_id}", 
-                              headers=headers) as response:
-            result = await response.json()
+        async with session.get(f"{API_BASE_URL}/api/task/{task_id}") as response:
+            result = await response.json(loads=json_loads)
             status = result.get("data", {}).get("status", "unknown")
             message = result.get("message", "")
             
-            return status, message
+            # 只支持秒数形式的Retry-After
+            retry_after = response.headers.get("Retry-After")
+            retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+            
+            return status, message, retry_after
             
     except Exception as e:
         print(f"❌ {task_name} 状态检查异常: {str(e)}")
-        return "error", str(e)
+        return "error", str(e), None
+
+class TaskWatch:
+    """单个任务的最新状态，状态变化时通过事件唤醒对应的监控协程"""
+    
+    def __init__(self, task_name):
+        self.task_name = task_name
+        self.status = None
+        self.message = ""
+        self.changed = asyncio.Event()
 
-async def monitor_task(session, task_id, task_name):
-    """监控任务进度"""
+async def poll_task_statuses(session, watches):
+    """
+    统一轮询所有未结束任务的状态
+    
+    每轮按POLL_BATCH_SIZE分组并发查询，只在状态变化时通知对应任务；
+    轮询间隔采用指数退避，有任务状态变化时重置
+    """
+    delay = POLL_INITIAL_DELAY
+    
+    while True:
+        active = [(task_id, watch) for task_id, watch in watches.items()
+                  if watch.status not in FINAL_STATUSES]
+        if not active:
+            return
+        
+        changed = False
+        retry_after = None
+        for start in range(0, len(active), POLL_BATCH_SIZE):
+            group = active[start:start + POLL_BATCH_SIZE]
+            results = await asyncio.gather(*(
+                check_task_status(session, task_id, watch.task_name) for task_id, watch in group
+            ))
+            for (task_id, watch), (status, message, group_retry_after) in zip(group, results):
+                if group_retry_after:
+                    retry_after = max(retry_after or 0, group_retry_after)
+                if status != watch.status:
+                    watch.status = status
+                    watch.message = message
+                    watch.changed.set()
+                    changed = True
+        
+        # 有状态变化时缩短间隔，尽快捕捉下一次变化
+        delay = POLL_INITIAL_DELAY if changed else min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+        if retry_after:
+            delay = max(delay, retry_after)
+        # 加入随机抖动，避免多个测试进程同时请求
+        await asyncio.sleep(delay + random.uniform(0, POLL_JITTER))
+
+async def monitor_task(watch, task_id):
+    """监控任务进度，等待统一轮询推送的状态变化"""
+    task_name = watch.task_name
     print(f"🔍 开始监控 {task_name} (ID: {task_id})")
     
     start_time = time.time()
-    last_status = None
     
     while True:
-        status, message = await check_task_status(session, task_id, task_name)
+        await watch.changed.wait()
+        watch.changed.clear()
+        status = watch.status
         
-        if status != last_status:
-            elapsed = time.time() - start_time
-            print(f"📊 {task_name}: {status} - {message} (已用时: {elapsed:.1f}s)")
-            last_status = status
+        elapsed = time.time() - start_time
+        print(f"📊 {task_name}: {status} - {watch.message} (已用时: {elapsed:.1f}s)")
         
-        if status in ["success", "failed", "error"]:
-            total_time = time.time() - start_time
+        if status in FINAL_STATUSES:
             if status == "success":
-                print(f"✅ {task_name} 完成! 总耗时: {total_time:.1f}s")
+                print(f"✅ {task_name} 完成! 总耗时: {elapsed:.1f}s")
             else:
-                print(f"❌ {task_name} 失败! 总耗时: {total_time:.1f}s")
+                print(f"❌ {task_name} 失败! 总耗时: {elapsed:.1f}s")
             break
-            
-        await asyncio.sleep(2)  # 每2秒检查一次
 
 async def test_concurrent_processing():
     """测试并发处理"""
@@ -102,7 +206,7 @@ async def test_concurrent_processing():
     print(f"🎯 测试URL数量: {len(TEST_URLS)}")
     print("-" * 60)
     
-    async with aiohttp.ClientSession() as session:
+    async with create_session() as session:
         # 1. 并发提交所有任务
         print("📤 并发提交任务...")
         submit_start = time.time()
@@ -113,7 +217,7 @@ async def test_concurrent_processing():
             submit_tasks.append(submit_task(session, url, task_name))
         
         # 等待所有任务提交完成
-        task_ids = await asyncio.gather(*submit_tasks)
+        task_ids = await run_all(submit_tasks, timeout=SUBMIT_BATCH_TIMEOUT)
         submit_total_time = time.time() - submit_start
         
         print(f"📤 所有任务提交完成，总耗时: {submit_total_time:.2f}s")
@@ -121,16 +225,32 @@ async def test_concurrent_processing():
         
         # 2. 并发监控所有任务
         print("🔍 开始并发监控...")
+        watches = {}
         monitor_tasks = []
         
         for i, task_id in enumerate(task_ids):
             if task_id:
-                task_name = f"Task-{i+1}"
-                monitor_tasks.append(monitor_task(session, task_id, task_name))
+                watch = TaskWatch(f"Task-{i+1}")
+                watches[task_id] = watch
+                monitor_tasks.append(asyncio.create_task(monitor_task(watch, task_id)))
+        
+        # 所有任务共用一个轮询协程
+        poller = asyncio.create_task(poll_task_statuses(session, watches))
         
-        # 等待所有任务完成
+        # 按完成顺序等待，整批设置超时，避免单个任务卡住整个测试
         if monitor_tasks:
-            await asyncio.gather(*monitor_tasks)
+            batch_timeout = MONITOR_TASK_TIMEOUT * len(monitor_tasks) + MONITOR_TIMEOUT_BUFFER
+            finished = 0
+            try:
+                for next_done in asyncio.as_completed(monitor_tasks, timeout=batch_timeout):
+                    await next_done
+                    finished += 1
+                    print(f"📈 监控进度: {finished}/{len(monitor_tasks)}")
+            except asyncio.TimeoutError:
+                print(f"⏰ 监控超时 ({batch_timeout}s)，取消剩余 {len(monitor_tasks) - finished} 个任务")
+                for task in monitor_tasks:
+                    task.cancel()
+        poller.cancel()
         
         print("-" * 60)
         print("🎉 并发测试完成!")
@@ -143,7 +263,7 @@ async def test_sequential_vs_concurrent():
     # 注意：这里只是模拟提交时间的对比
     # 实际的处理时间取决于视频长度和服务器性能
     
-    async with aiohttp.ClientSession() as session:
+    async with create_session() as session:
         # 串行提交测试
         print("🐌 串行提交测试...")
         serial_start = time.time()
@@ -166,7 +286,7 @@ async def test_sequential_vs_concurrent():
             task_name = f"Concurrent-{i+1}"
             concurrent_tasks.append(submit_task(session, url, task_name))
             
-        await asyncio.gather(*concurrent_tasks)
+        await run_all(concurrent_tasks, timeout=SUBMIT_BATCH_TIMEOUT)
         concurrent_time = time.time() - concurrent_start
         
         print(f"🚀 并发提交总耗时: {concurrent_time:.2f}s")
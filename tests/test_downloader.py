@@ -47,6 +47,27 @@ class TestDownloaderFactory(unittest.TestCase):
         url = "https://www.unsupported.com/video/12345"
         downloader = create_downloader(url)
         self.assertIsNone(downloader)
+    
+    def test_create_downloader_domain_in_path(self):
+        """测试域名只出现在路径或参数中时不匹配"""
+        url = "https://www.unsupported.com/share?from=youtube.com"
+        downloader = create_downloader(url)
+        self.assertIsNone(downloader)
+    
+    def test_can_handle(self):
+        """测试下载器按域名判断是否可以处理URL"""
+        downloader = YoutubeDownloader()
+        self.assertTrue(downloader.can_handle("https://youtu.be/12345"))
+        self.assertTrue(downloader.can_handle("https://music.youtube.com/watch?v=12345"))
+        self.assertFalse(downloader.can_handle("https://youtube.com.example.org/watch?v=12345"))
+        self.assertFalse(downloader.can_handle("https://www.douyin.com/video/12345"))
+    
+    def test_create_downloader_subdomain(self):
+        """测试子域名匹配，相似域名不匹配"""
+        self.assertIsInstance(create_downloader("https://m.youtube.com/watch?v=12345"), YoutubeDownloader)
+        self.assertIsInstance(create_downloader("https://b23.tv/abcdef"), BilibiliDownloader)
+        self.assertIsInstance(create_downloader("https://www.iesdouyin.com/share/video/7345678901234567890/"), DouyinDownloader)
+        self.assertIsNone(create_downloader("https://notyoutube.com/watch?v=12345"))
 
 
 class TestDouyinDownloader(unittest.TestCase):
@@ -88,6 +109,19 @@ class TestDouyinDownloader(unittest.TestCase):
         self.assertEqual(info["platform"], "douyin")
 
 
+    def test_extract_aweme_id(self):
+        """测试从各种URL格式中提取抖音视频ID"""
+        downloader = DouyinDownloader()
+        self.assertEqual(downloader.extract_video_id("https://www.douyin.com/video/7508714157055806783"), "7508714157055806783")
+        self.assertEqual(downloader.extract_video_id("https://www.douyin.com/note/7508714157055806783?from=share"), "7508714157055806783")
+        self.assertEqual(downloader.extract_video_id("https://www.douyin.com/share?aweme_id=123456"), "123456")
+        self.assertEqual(downloader.extract_video_id("https://www.douyin.com/share/123456"), "123456")
+        # 查询参数中的ID优先于路径末尾的数字
+        self.assertEqual(downloader.extract_video_id("https://www.douyin.com/share/user/999?aweme_id=555"), "555")
+        with self.assertRaises(ValueError):
+            downloader.extract_video_id("https://www.douyin.com/user/abc")
+
+
 class TestBilibiliDownloader(unittest.TestCase):
     """测试B站下载器"""
     
@@ -137,5 +171,95 @@ class TestBilibiliDownloader(unittest.TestCase):
         self.assertEqual(info["platform"], "bilibili")
 
 
+class TestYoutubeDownloader(unittest.TestCase):
+    """测试YouTube下载器"""
+    
+    @patch('downloaders.youtube.YoutubeDownloader.resolve_short_url', side_effect=lambda url: url)
+    def test_extract_video_id(self, mock_resolve):
+        """测试提取YouTube视频ID"""
+        downloader = YoutubeDownloader()
+        self.assertEqual(downloader.extract_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s"), "dQw4w9WgXcQ")
+        self.assertEqual(downloader.extract_video_id("https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+        self.assertEqual(downloader.extract_video_id("https://youtu.be/dQw4w9WgXcQ?si=abc"), "dQw4w9WgXcQ")
+        # 不带协议头的URL
+        self.assertEqual(downloader.extract_video_id("youtube.com/watch?v=abcdefghijk"), "abcdefghijk")
+        self.assertEqual(downloader.extract_video_id("youtu.be/abcdefghijk"), "abcdefghijk")
+        with self.assertRaises(ValueError):
+            downloader.extract_video_id("https://www.youtube.com/channel/UC123")
+    
+    @patch('downloaders.base.BaseDownloader.make_api_request')
+    def test_get_video_info_cached_per_instance(self, mock_api_request):
+        """测试同一实例重复获取视频信息时只请求一次API"""
+        mock_api_request.return_value = {
+            "code": 200,
+            "data": {
+                "title": "测试视频",
+                "channel": {"name": "测试作者"},
+                "audios": {"items": [{"url": "https://example.com/audio.m4a"}]},
+                "subtitles": {"items": [{"code": "en", "url": "https://example.com/en.xml"}, {"code": "zh", "url": "https://example.com/zh.xml"}]}
+            }
+        }
+        downloader = YoutubeDownloader()
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        info = downloader.get_video_info(url)
+        self.assertIs(downloader.get_video_info(url), info)
+        mock_api_request.assert_called_once()
+        self.assertEqual(info["author"], "测试作者")
+        self.assertEqual(info["subtitle_info"]["code"], "zh")
+    
+    @patch('downloaders.base.BaseDownloader.make_api_request')
+    def test_get_video_info_subtitle_fallback(self, mock_api_request):
+        """测试没有中文字幕时选择第一条英文字幕"""
+        mock_api_request.return_value = {
+            "code": 200,
+            "data": {
+                "title": "测试视频",
+                "audios": {"items": [{"url": "https://example.com/audio.m4a"}]},
+                "subtitles": {"items": [
+                    {"code": "ja", "url": "https://example.com/ja.xml"},
+                    {"code": "en", "url": "https://example.com/en.xml"},
+                    {"code": "en", "url": "https://example.com/en2.xml"}
+                ]}
+            }
+        }
+        downloader = YoutubeDownloader()
+        info = downloader.get_video_info("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        self.assertEqual(info["subtitle_info"]["url"], "https://example.com/en.xml")
+        self.assertEqual(info["author"], "未知作者")
+    
+    def test_parse_subtitle_xml(self):
+        """测试解析YouTube字幕XML"""
+        xml_content = (
+            '<?xml version="1.0" encoding="utf-8" ?>'
+            '<transcript>'
+            '<text start="0.5" dur="2.0">第一句</text>'
+            '<text start="2.5" dur="1.0"></text>'
+            '<text start="3.5" dur="2.0"> 第二句 </text>'
+            '</transcript>'
+        )
+        downloader = YoutubeDownloader()
+        self.assertEqual(downloader._parse_youtube_subtitle_xml(xml_content), "第一句 第二句")
+        self.assertEqual(downloader._parse_youtube_subtitle_xml(xml_content.encode("utf-8")), "第一句 第二句")
+    
+    def test_parse_subtitle_xml_out_of_order(self):
+        """测试乱序字幕按开始时间排序"""
+        xml_content = (
+            '<transcript>'
+            '<text start="3.5" dur="2.0">第二句</text>'
+            '<text start="0.5" dur="2.0">第一句</text>'
+            '</transcript>'
+        )
+        downloader = YoutubeDownloader()
+        self.assertEqual(downloader._parse_youtube_subtitle_xml(xml_content), "第一句 第二句")
+    
+    @patch('downloaders.youtube.YoutubeDownloader.get_video_info')
+    def test_get_subtitle_reuses_video_info(self, mock_get_video_info):
+        """测试传入视频信息时不再重复获取"""
+        downloader = YoutubeDownloader()
+        video_info = {"video_id": "dQw4w9WgXcQ", "subtitle_info": None}
+        self.assertIsNone(downloader.get_subtitle("https://www.youtube.com/watch?v=dQw4w9WgXcQ", video_info))
+        mock_get_video_info.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,14 +1,21 @@
 import os
 import sys
+import io
 import json
+import errno
+import asyncio
+import threading
+import time
 import pytest
+import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 # 添加项目根目录到导入路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from transcriber import Transcriber, SRTConverter
+from transcriber.transcriber import _move_file
 
 
 class TestSRTConverter(unittest.TestCase):
@@ -28,14 +35,15 @@ class TestSRTConverter(unittest.TestCase):
 00:00:10,500 --> 00:00:15,000
 这是第三行字幕
 """
-        self.test_srt_file = "test_subtitle.srt"
+        # 使用独立的临时目录，避免并行测试时文件冲突
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.test_srt_file = os.path.join(self.temp_dir.name, "test_subtitle.srt")
         with open(self.test_srt_file, "w", encoding="utf-8") as f:
             f.write(self.test_srt_content)
     
     def tearDown(self):
         """清理测试文件"""
-        if os.path.exists(self.test_srt_file):
-            os.remove(self.test_srt_file)
+        self.temp_dir.cleanup()
     
     def test_parse_srt(self):
         """测试解析SRT文件"""
@@ -45,6 +53,39 @@ class TestSRTConverter(unittest.TestCase):
         self.assertEqual(converter.segments[0]['text'], "这是第一行字幕")
         self.assertEqual(converter.segments[0]['start_time'], "00:00:00,000")
         self.assertEqual(converter.segments[0]['end_time'], "00:00:05,000")
+        self.assertEqual(converter.segments[1]['start_sec'], 5.5)
+        self.assertEqual(converter.segments[1]['end_sec'], 10.0)
+        self.assertEqual(converter.get_end_sec(2), 15.0)
+    
+    def test_parse_srt_multiline(self):
+        """测试解析多行字幕及文件末尾无空行的情况"""
+        with open(self.test_srt_file, "w", encoding="utf-8", newline="\r\n") as f:
+            f.write("1\n00:01:02,250 --> 00:01:04,000\n第一行\n第二行\n\n\n2\n00:01:05,000 --> 00:01:06,000\n最后一行")
+        converter = SRTConverter(self.test_srt_file)
+        self.assertEqual(len(converter.segments), 2)
+        self.assertEqual(converter.segments[0]['text'], "第一行\n第二行")
+        self.assertEqual(converter.segments[0]['start_sec'], 62.25)
+        self.assertEqual(converter.segments[1]['text'], "最后一行")
+    
+    def test_parse_srt_skip_malformed(self):
+        """测试时间轴格式错误的片段被跳过，其余片段正常解析"""
+        data = ("1\n00:00:01,000 --> 00:00:02,000\n第一句\n\n"
+                "2\n0:00:03,000 --> 00:00:04,000\n坏片段\n\n"
+                "3\n00:00:05,000 --> 00:00:06,000\n第三句\n").encode("utf-8")
+        converter = SRTConverter(data)
+        self.assertEqual([s['index'] for s in converter.segments], [1, 3])
+        self.assertEqual(converter.to_text(), "第一句\n第三句")
+    
+    def test_parse_srt_from_bytes_and_stream(self):
+        """测试从bytes内容和二进制文件对象解析SRT"""
+        data = self.test_srt_content.encode("utf-8")
+        from_bytes = SRTConverter(data)
+        self.assertEqual(from_bytes.to_text(), "这是第一行字幕\n这是第二行字幕\n这是第三行字幕")
+        
+        stream = io.BytesIO(data)
+        from_stream = SRTConverter(stream)
+        self.assertEqual(len(from_stream.segments), 3)
+        self.assertFalse(stream.closed)
     
     def test_to_lrc(self):
         """测试转换为LRC格式"""
@@ -56,9 +97,16 @@ class TestSRTConverter(unittest.TestCase):
         self.assertIn("[ar:Whisper]", lrc_content)
         
         # 验证是否包含时间戳和文本
-        self.assertIn("[00:00:00]这是第一行字幕", lrc_content)
-        self.assertIn("[00:00:05]这是第二行字幕", lrc_content)
-        self.assertIn("[00:00:10]这是第三行字幕", lrc_content)
+        self.assertIn("[00:00.000]这是第一行字幕", lrc_content)
+        self.assertIn("[00:05.500]这是第二行字幕", lrc_content)
+        self.assertIn("[00:10.500]这是第三行字幕", lrc_content)
+    
+    def test_seconds_to_lrc_time(self):
+        """测试LRC时间标签格式"""
+        converter = SRTConverter(self.test_srt_file)
+        self.assertEqual(converter._seconds_to_lrc_time(0), "[00:00.000]")
+        self.assertEqual(converter._seconds_to_lrc_time(62.25), "[01:02.250]")
+        self.assertEqual(converter._seconds_to_lrc_time(59.9996), "[01:00.000]")
     
     def test_to_text(self):
         """测试转换为纯文本"""
@@ -76,23 +124,27 @@ class TestTranscriber(unittest.TestCase):
     
     def setUp(self):
         """设置测试环境"""
+        # 使用独立的临时目录，避免并行测试时文件冲突
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.test_output_dir = os.path.join(self.temp_dir.name, "test_output")
+        
         # 创建临时配置
         self.test_config = {
             "capswriter": {
                 "server_url": "ws://localhost:6006"
             },
             "storage": {
-                "output_dir": "./test_output"
+                "output_dir": self.test_output_dir
             }
         }
         
         # 创建临时输出目录
-        os.makedirs("./test_output", exist_ok=True)
+        os.makedirs(self.test_output_dir, exist_ok=True)
         
         # 创建测试文件
         self.test_merge_txt_content = "这是测试的转录文本，包含一些句子。这是第二句。"
-        self.test_audio_file = "test_audio.mp3"
-        self.test_merge_txt = "test_audio.merge.txt"
+        self.test_audio_file = os.path.join(self.temp_dir.name, "test_audio.mp3")
+        self.test_merge_txt = os.path.join(self.temp_dir.name, "test_audio.merge.txt")
         
         # 写入merge.txt测试文件
         with open(self.test_merge_txt, "w", encoding="utf-8") as f:
@@ -104,18 +156,8 @@ class TestTranscriber(unittest.TestCase):
     
     def tearDown(self):
         """清理测试环境"""
-        # 删除测试文件
-        for file in [self.test_audio_file, self.test_merge_txt]:
-            if os.path.exists(file):
-                os.remove(file)
-        
-        # 删除测试输出目录中的文件
-        for file in os.listdir("./test_output"):
-            os.remove(os.path.join("./test_output", file))
-        
-        # 删除测试输出目录
-        if os.path.exists("./test_output"):
-            os.rmdir("./test_output")
+        # 删除临时目录及其中的测试文件和输出文件
+        self.temp_dir.cleanup()
     
     def test_transcribe(self, mock_client_transcriber):
         """测试转录功能"""
@@ -140,6 +182,30 @@ class TestTranscriber(unittest.TestCase):
         
         # 验证转录结果是否包含merge.txt内容
         self.assertEqual(result["transcript"], self.test_merge_txt_content)
+        
+        # 验证合并文本已移动并重命名为主输出文件
+        self.assertTrue(os.path.exists(result["txt_path"]))
+        self.assertFalse(os.path.exists(self.test_merge_txt))
+    
+    def test_transcribe_without_transcript(self, mock_client_transcriber):
+        """测试不需要转录文本时只返回文件路径"""
+        mock_client_transcriber.transcribe.return_value = (True, [self.test_merge_txt])
+        
+        transcriber = Transcriber(config=self.test_config)
+        result = transcriber.transcribe(self.test_audio_file, "test_output", return_transcript=False)
+        
+        self.assertEqual(result["transcript"], "")
+        self.assertTrue(os.path.exists(result["txt_path"]))
+    
+    def test_move_file_cross_device(self, mock_client_transcriber):
+        """测试跨设备移动文件时退回复制后删除"""
+        target = os.path.join(self.test_output_dir, "moved.txt")
+        with patch("transcriber.transcriber.os.replace", side_effect=OSError(errno.EXDEV, "跨设备")):
+            _move_file(self.test_merge_txt, target)
+        
+        self.assertFalse(os.path.exists(self.test_merge_txt))
+        with open(target, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), self.test_merge_txt_content)
     
     def test_transcribe_error(self, mock_client_transcriber):
         """测试转录失败的情况"""
@@ -155,6 +221,49 @@ class TestTranscriber(unittest.TestCase):
         
         # 验证客户端转录方法被调用
         mock_client_transcriber.transcribe.assert_called_once_with(self.test_audio_file)
+    
+    def test_transcribe_batch(self, mock_client_transcriber):
+        """测试批量转录，结果顺序与输入一致，失败项返回异常对象"""
+        mock_client_transcriber.transcribe.return_value = (True, [self.test_merge_txt])
+        
+        transcriber = Transcriber(config=self.test_config)
+        missing_file = os.path.join(self.temp_dir.name, "missing.mp3")
+        results = asyncio.run(transcriber.transcribe_batch([missing_file, self.test_audio_file], max_concurrent=2))
+        
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0], FileNotFoundError)
+        self.assertEqual(results[1]["transcript"], self.test_merge_txt_content)
+    
+    def test_transcribe_batch_serializes_client(self, mock_client_transcriber):
+        """测试批量转录时Client_Only客户端调用不会并发执行"""
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+        
+        def fake_transcribe(audio_path):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            merge_txt = os.path.splitext(audio_path)[0] + ".merge.txt"
+            with open(merge_txt, "w", encoding="utf-8") as f:
+                f.write("文本")
+            with lock:
+                state["active"] -= 1
+            return True, [merge_txt]
+        
+        mock_client_transcriber.transcribe.side_effect = fake_transcribe
+        audio_files = []
+        for i in range(3):
+            audio_file = os.path.join(self.temp_dir.name, f"audio_{i}.mp3")
+            with open(audio_file, "w", encoding="utf-8") as f:
+                f.write("模拟音频文件")
+            audio_files.append(audio_file)
+        
+        transcriber = Transcriber(config=self.test_config)
+        results = asyncio.run(transcriber.transcribe_batch(audio_files, max_concurrent=3))
+        
+        self.assertEqual([r["transcript"] for r in results], ["文本"] * 3)
+        self.assertEqual(state["peak"], 1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,135 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到导入路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.wechat import WechatNotifier, _clean_url, _split_text_by_bytes, send_long_text_wechat
+
+
+class TestCleanUrl(unittest.TestCase):
+    """测试URL清洗"""
+    
+    def test_strip_query(self):
+        """测试普通链接去掉全部查询参数"""
+        self.assertEqual(_clean_url("https://www.douyin.com/video/1?a=1&b=2"), "https://www.douyin.com/video/1")
+        self.assertEqual(_clean_url("https://www.douyin.com/video/1"), "https://www.douyin.com/video/1")
+    
+    def test_keep_xsec_token(self):
+        """测试小红书链接只保留 xsec_token 参数"""
+        self.assertEqual(
+            _clean_url("https://www.xiaohongshu.com/explore/abc?a=1&xsec_token=tk&b=2"),
+            "https://www.xiaohongshu.com/explore/abc?xsec_token=tk",
+        )
+        self.assertEqual(
+            _clean_url("https://www.xiaohongshu.com/explore/abc?a_xsec_token=1"),
+            "https://www.xiaohongshu.com/explore/abc",
+        )
+        self.assertEqual(_clean_url("http://xhslink.com/abc"), "http://xhslink.com/abc")
+
+
+class TestNotifyTaskStatus(unittest.TestCase):
+    """测试任务状态通知内容"""
+    
+    def test_notify_content(self):
+        """测试通知内容各行顺序及转录预览"""
+        notifier = WechatNotifier("https://hook")
+        with patch.object(notifier, "send_text_async") as mock_send:
+            notifier.notify_task_status("https://example.com/v?a=1", "转录完成", title="标题", author="作者", transcript="正文")
+        
+        lines = mock_send.call_args.args[0].split("\n")
+        self.assertEqual(lines[1:], [
+            "视频转录任务状态更新:",
+            "链接: https://example.com/v",
+            "状态: 转录完成",
+            "标题: 标题",
+            "作者: 作者",
+            "",
+            "正文",
+        ])
+
+
+class TestLongTextSplit(unittest.TestCase):
+    """测试长文本分段"""
+    
+    def test_split_respects_byte_limit(self):
+        """测试每段不超过字节上限且不拆分多字节字符"""
+        text = "中文abc" * 50
+        chunks = _split_text_by_bytes(text, 10)
+        self.assertEqual("".join(chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk.encode("utf-8")), 10)
+    
+    def test_split_limit_below_char_size(self):
+        """测试上限小于单个字符字节数时每段仍包含完整字符"""
+        self.assertEqual(_split_text_by_bytes("中文", 2), ["中", "文"])
+    
+    def test_split_short_and_empty(self):
+        """测试不超过上限的文本原样返回，空文本不产生分段"""
+        self.assertEqual(_split_text_by_bytes("中文", 6), ["中文"])
+        self.assertEqual(_split_text_by_bytes("", 6), [])
+    
+    def test_split_ascii(self):
+        """测试纯ASCII文本按字符数切分"""
+        self.assertEqual(_split_text_by_bytes("abcdefg", 3), ["abc", "def", "g"])
+    
+    def test_split_invalid_limit(self):
+        """测试字节上限不大于0时明确报错"""
+        for text in ("abc", "中文"):
+            for limit in (0, -1):
+                with self.assertRaises(ValueError):
+                    _split_text_by_bytes(text, limit)
+    
+    def test_send_long_text_in_order(self):
+        """测试分段按顺序发送，每段带相同前缀"""
+        text = "一二三四五六七八九十" * 200
+        with patch("utils.wechat.WechatNotifier.send_text") as mock_send:
+            send_long_text_wechat("标题", "https://example.com/v?a=1", text, webhook="https://hook")
+        
+        contents = [call.args[0] for call in mock_send.call_args_list]
+        self.assertGreater(len(contents), 1)
+        prefix = "标题：标题\nurl：https://example.com/v\n校对文本\n"
+        self.assertTrue(all(content.startswith(prefix) for content in contents))
+        self.assertEqual("".join(content[len(prefix):] for content in contents), text)
+        self.assertTrue(all(len(content.encode("utf-8")) <= 4000 for content in contents))
+    
+    def test_send_long_text_oversized_title(self):
+        """测试标题超长时截断标题，正文仍完整发送"""
+        title = "很长的标题" * 400
+        text = "正文abc" * 500
+        with patch("utils.wechat.WechatNotifier.send_text", return_value=True) as mock_send:
+            ok = send_long_text_wechat(title, "https://example.com/v", text, webhook="https://hook")
+        
+        self.assertTrue(ok)
+        contents = [call.args[0] for call in mock_send.call_args_list]
+        prefix = contents[0].split("校对文本\n", 1)[0] + "校对文本\n"
+        self.assertTrue(prefix.endswith("...\nurl：https://example.com/v\n校对文本\n"))
+        self.assertTrue(all(len(content.encode("utf-8")) <= 4000 for content in contents))
+        self.assertEqual("".join(content[len(prefix):] for content in contents), text)
+    
+    def test_send_long_text_retry(self):
+        """测试失败分段重试后按原顺序继续发送"""
+        text = "一二三四五六七八九十" * 200
+        with patch("utils.wechat.time.sleep"), \
+                patch("utils.wechat.WechatNotifier.send_text", side_effect=[True, False, True]) as mock_send:
+            ok = send_long_text_wechat("标题", "https://example.com/v", text, webhook="https://hook")
+        
+        self.assertTrue(ok)
+        contents = [call.args[0] for call in mock_send.call_args_list]
+        self.assertEqual(len(contents), 3)
+        self.assertEqual(contents[1], contents[2])
+    
+    def test_send_long_text_gives_up(self):
+        """测试重试耗尽后返回失败"""
+        with patch("utils.wechat.time.sleep"), \
+                patch("utils.wechat.WechatNotifier.send_text", return_value=False) as mock_send:
+            ok = send_long_text_wechat("标题", "https://example.com/v", "正文", webhook="https://hook")
+        
+        self.assertFalse(ok)
+        self.assertEqual(mock_send.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
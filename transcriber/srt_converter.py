@@ -1,10 +1,17 @@
-import re
+import io
 import os
+import re
+from array import array
 from utils import setup_logger
 
 # 创建日志记录器
 logger = setup_logger("srt_converter")
 
+# SRT解析状态：等待序号行、等待时间轴行、收集字幕文本
+_EXPECT_INDEX, _EXPECT_TIME, _COLLECT_TEXT = range(3)
+# 时间轴行格式：HH:MM:SS,mmm --> HH:MM:SS,mmm
+_TIME_LINE_RE = re.compile(r'(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})')
+
 class SRTConverter:
     """
     SRT格式字幕转换器，支持转换为LRC等格式
@@ -14,50 +21,153 @@ class SRTConverter:
         初始化SRT转换器
         
         参数:
-            srt_file: SRT文件路径
+            srt_file: SRT文件路径，也可以是SRT内容（bytes）或已打开的文件对象
         """
         self.srt_file = srt_file
-        self.segments = self._parse_srt()
+        # 用于日志和LRC文件头的名称，避免把bytes内容直接写进日志
+        if isinstance(srt_file, (bytes, bytearray)):
+            self.name = "<bytes>"
+        elif hasattr(srt_file, "read"):
+            self.name = str(getattr(srt_file, "name", "<stream>"))
+        else:
+            self.name = os.fspath(srt_file)
+        # 按字段分列存储字幕片段，开始秒数使用紧凑的double数组；
+        # 结束秒数在转换时用不到，需要时再由结束时间计算
+        self._index = []
+        self._start_time = []
+        self._end_time = []
+        self._start_sec = array('d')
+        self._text = []
+        self._segments = None
+        # 转换结果缓存，片段解析后不再变化
+        self._lrc_cache = None
+        self._text_cache = None
+        self._parse_srt()
     
-    def _parse_srt(self):
+    @property
+    def segments(self):
         """
-        解析SRT文件
+        字幕片段列表（按需构建的字典视图，兼容旧接口）
         
         返回:
             list: 字幕片段列表，每个片段包含开始时间、结束时间和文本
         """
-        try:
-            with open(self.srt_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 正则表达式匹配SRT格式的每个片段
-            pattern = r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n([\s\S]*?)(?=\n\d+\n|$)'
-            matches = re.findall(pattern, content)
-            
-            segments = []
-            for match in matches:
-                index = int(match[0])
-                start_time = match[1]
-                end_time = match[2]
-                text = match[3].strip()
-                
-                # 转换时间格式为秒
-                start_sec = self._time_to_seconds(start_time)
-                end_sec = self._time_to_seconds(end_time)
-                
-                segments.append({
+        if self._segments is None:
+            self._segments = [
+                {
                     'index': index,
                     'start_time': start_time,
                     'end_time': end_time,
                     'start_sec': start_sec,
-                    'end_sec': end_sec,
+                    'end_sec': self._time_to_seconds(end_time),
                     'text': text
-                })
+                }
+                for index, start_time, end_time, start_sec, text in zip(
+                    self._index, self._start_time, self._end_time,
+                    self._start_sec, self._text
+                )
+            ]
+        return self._segments
+    
+    def get_end_sec(self, i):
+        """
+        获取指定片段的结束时间
+        
+        参数:
+            i: 片段下标
             
-            return segments
+        返回:
+            float: 结束时间秒数
+        """
+        return self._time_to_seconds(self._end_time[i])
+    
+    def _iter_lines(self):
+        """
+        按行读取SRT内容，支持文件路径、bytes和文件对象
+        
+        返回:
+            iterator: 文本行迭代器
+        """
+        source = self.srt_file
+        if isinstance(source, (bytes, bytearray)):
+            yield from io.StringIO(source.decode('utf-8-sig'))
+        elif hasattr(source, "read"):
+            if isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+                # 二进制文件对象，解码后读取，结束时不关闭调用方的文件
+                text = io.TextIOWrapper(source, encoding='utf-8-sig')
+                try:
+                    yield from text
+                finally:
+                    text.detach()
+            else:
+                yield from source
+        else:
+            with open(source, 'r', encoding='utf-8-sig') as f:
+                yield from f
+    
+    def _parse_srt(self):
+        """
+        解析SRT文件，结果写入各字段列表
+        
+        返回:
+            int: 解析出的字幕片段数量
+        """
+        indexes, start_times, end_times, texts = [], [], [], []
+        start_secs = array('d')
+        
+        def add_segment():
+            indexes.append(index)
+            start_times.append(start_time)
+            end_times.append(end_time)
+            start_secs.append(self._time_to_seconds(start_time))
+            texts.append("\n".join(text_lines))
+        
+        try:
+            state = _EXPECT_INDEX
+            text_lines = []
+            
+            # 逐行扫描，内存占用只与单个片段大小相关
+            for line in self._iter_lines():
+                line = line.strip()
+                
+                if state == _COLLECT_TEXT:
+                    if line:
+                        text_lines.append(line)
+                        continue
+                    # 空行表示当前片段结束
+                    add_segment()
+                    state = _EXPECT_INDEX
+                elif state == _EXPECT_INDEX:
+                    if line.isdigit():
+                        index = int(line)
+                        state = _EXPECT_TIME
+                elif state == _EXPECT_TIME:
+                    match = _TIME_LINE_RE.match(line)
+                    if not match:
+                        # 时间轴格式不正确，只丢弃该片段，继续解析后续片段
+                        logger.warning(f"跳过时间轴格式错误的字幕片段: {index}, {line}")
+                        state = _EXPECT_INDEX
+                        continue
+                    start_time, end_time = match.groups()
+                    text_lines = []
+                    state = _COLLECT_TEXT
+            
+            # 文件末尾没有空行时，补上最后一个片段
+            if state == _COLLECT_TEXT:
+                add_segment()
         except Exception as e:
             logger.exception(f"解析SRT文件失败: {str(e)}")
-            return []
+            return 0
+        
+        self._index = indexes
+        self._start_time = start_times
+        self._end_time = end_times
+        self._start_sec = start_secs
+        self._text = texts
+        self._segments = None
+        self._lrc_cache = None
+        self._text_cache = None
+        return len(texts)
     
     def _time_to_seconds(self, time_str):
         """
@@ -69,12 +179,12 @@ class SRTConverter:
         返回:
             float: 秒数
         """
-        hours, minutes, seconds = time_str.replace(',', '.').split(':')
-        return float(hours) * 3600 + float(minutes) * 60 + float(seconds)
+        return (int(time_str[0:2]) * 3600 + int(time_str[3:5]) * 60
+                + int(time_str[6:8]) + int(time_str[9:12]) * 0.001)
     
     def _seconds_to_lrc_time(self, seconds):
         """
-        将秒数转换为LRC时间格式 [MM:SS.xx]
+        将秒数转换为LRC时间格式 [mm:ss.mmm]
         
         参数:
             seconds: 秒数
@@ -82,9 +192,10 @@ class SRTConverter:
         返回:
             str: LRC格式时间字符串
         """
-        minutes = int(seconds // 60)
-        seconds = seconds % 60
-        return f"[{minutes:02d}:{seconds:06.3f}]".replace('.', ':')
+        total_ms = int(round(seconds * 1000))
+        minutes, rem = divmod(total_ms, 60000)
+        secs, ms = divmod(rem, 1000)
+        return f"[{minutes:02d}:{secs:02d}.{ms:03d}]"
     
     def to_lrc(self):
         """
@@ -93,23 +204,24 @@ class SRTConverter:
         返回:
             str: LRC格式字符串
         """
-        if not self.segments:
-            logger.error(f"没有可用的SRT片段: {self.srt_file}")
+        if not self._text:
+            logger.error(f"没有可用的SRT片段: {self.name}")
             return ""
         
-        lrc_lines = []
+        if self._lrc_cache is not None:
+            return self._lrc_cache
         
-        # 添加LRC文件头信息
-        lrc_lines.append("[ti:Transcription]")
-        lrc_lines.append("[ar:Whisper]")
-        lrc_lines.append(f"[al:{os.path.basename(self.srt_file)}]")
+        # LRC文件头信息
+        header = f"[ti:Transcription]\n[ar:Whisper]\n[al:{os.path.basename(self.name)}]"
         
-        # 添加时间戳和文本
-        for segment in self.segments:
-            timestamp = self._seconds_to_lrc_time(segment['start_sec'])
-            lrc_lines.append(f"{timestamp}{segment['text']}")
+        # 时间戳和文本
+        body = "\n".join(
+            f"{self._seconds_to_lrc_time(start_sec)}{text}"
+            for start_sec, text in zip(self._start_sec, self._text)
+        )
         
-        return "\n".join(lrc_lines)
+        self._lrc_cache = f"{header}\n{body}"
+        return self._lrc_cache
     
     def to_text(self):
         """
@@ -118,9 +230,10 @@ class SRTConverter:
         返回:
             str: 纯文本内容
         """
-        if not self.segments:
-            logger.error(f"没有可用的SRT片段: {self.srt_file}")
+        if not self._text:
+            logger.error(f"没有可用的SRT片段: {self.name}")
             return ""
         
-        text_lines = [segment['text'] for segment in self.segments]
-        return "\n".join(text_lines)
\ No newline at end of file
+        if self._text_cache is None:
+            self._text_cache = "\n".join(self._text)
+        return self._text_cache
\ No newline at end of file
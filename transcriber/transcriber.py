@@ -1,24 +1,74 @@
 import os
 import sys
-import json
+import errno
+import asyncio
 import shutil
-import importlib
+import threading
 import time
-from pathlib import Path
-from utils import setup_logger, load_config, ensure_dir
-from transcriber.srt_converter import SRTConverter
+from utils import setup_logger, load_config, ensure_dir, resolve_path, PROJECT_ROOT
 
 # 添加Client_Only到系统路径
-CLIENT_ONLY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Client_Only")
+CLIENT_ONLY_DIR = str(PROJECT_ROOT / "Client_Only")
 sys.path.append(CLIENT_ONLY_DIR)
 
 # 导入Client_Only模块
 import Client_Only.transcriber as client_transcriber
 from Client_Only.config import Config as ClientConfig
 
+# 设置Client_Only输出格式 - 只生成merge.txt文件
+ClientConfig.generate_txt = False
+ClientConfig.generate_merge_txt = True  # 只生成合并文本
+ClientConfig.generate_srt = False
+ClientConfig.generate_lrc = False
+ClientConfig.generate_json = False
+
+# 最近一次写入ClientConfig的服务器URL，相同时跳过重复配置
+_configured_server_url = None
+
+# Client_Only的websocket连接保存在类级全局状态Cosmic.websocket中，每个文件结束时关闭，
+# 多个线程同时调用会复用或关闭其他线程事件循环上的连接，因此对客户端调用串行化
+_CLIENT_LOCK = threading.Lock()
+
 # 创建日志记录器
 logger = setup_logger("transcriber")
 
+def _move_file(src, dst):
+    """
+    移动文件，同一文件系统内直接重命名，跨设备时退回复制后删除
+    
+    参数:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copyfile(src, dst)
+        os.remove(src)
+
+def _read_text(path):
+    """
+    一次性读取UTF-8文本文件并去除首尾空白
+    
+    按文件大小预分配缓冲区后直接读入，避免文本模式下分块读取和拼接的额外拷贝
+    
+    参数:
+        path: 文件路径
+        
+    返回:
+        str: 文件内容
+    """
+    with open(path, 'rb') as f:
+        buf = bytearray(os.fstat(f.fileno()).st_size)
+        del buf[f.readinto(buf):]
+    text = buf.decode('utf-8')
+    # 与文本模式读取保持一致，统一换行符
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.strip()
+
 class Transcriber:
     """
     音视频转录器，基于CapsWriter-Offline客户端
@@ -34,9 +84,10 @@ class Transcriber:
             config = load_config()
         
         self.config = config
-        self.output_dir = config.get("storage", {}).get("output_dir", "./output")
+        self.output_dir = resolve_path(config.get("storage", {}).get("output_dir", "./output"))
         self.max_retries = config.get("capswriter", {}).get("max_retries", 3)
         self.retry_delay = config.get("capswriter", {}).get("retry_delay", 5)
+        self.max_concurrent = config.get("capswriter", {}).get("max_concurrent", 1)
         
         # 确保输出目录存在
         ensure_dir(self.output_dir)
@@ -48,52 +99,83 @@ class Transcriber:
         """
         设置Client_Only的配置
         """
+        global _configured_server_url
         try:
             # 从项目配置中获取CapsWriter服务器信息
             server_url = self.config.get("capswriter", {}).get("server_url", "ws://localhost:6006")
+            if server_url == _configured_server_url:
+                return
             
             # 解析服务器地址和端口
-            if server_url.startswith("ws://"):
-                server_url = server_url[5:]
+            address = server_url[5:] if server_url.startswith("ws://") else server_url
             
-            if ":" in server_url:
-                server_addr, server_port = server_url.split(":")
+            if ":" in address:
+                server_addr, server_port = address.split(":")
                 server_port = int(server_port)
             else:
-                server_addr = server_url
+                server_addr = address
                 server_port = 6006
                 
             # 更新客户端配置
             ClientConfig.server_addr = server_addr
             ClientConfig.server_port = server_port
+            _configured_server_url = server_url
             
-            # 设置输出格式 - 只生成merge.txt文件
-            ClientConfig.generate_txt = False
-            ClientConfig.generate_merge_txt = True  # 只生成合并文本
-            ClientConfig.generate_srt = False
-            ClientConfig.generate_lrc = False
-            ClientConfig.generate_json = False
-            
-            logger.info(f"已配置Client_Only，服务器: {server_addr}:{server_port}，仅生成合并文本文件")
+            logger.info("已配置Client_Only，服务器: %s:%s，仅生成合并文本文件", server_addr, server_port)
         except Exception as e:
-            logger.exception(f"设置Client_Only配置失败: {str(e)}")
+            logger.exception("设置Client_Only配置失败: %s", e)
             raise
     
-    def transcribe(self, audio_path, output_base=None):
+    def _handle_merge_txt(self, merge_txt_path, final_txt_path, result, return_transcript=True):
+        """
+        处理Client_Only生成的合并文本文件
+        
+        将文件移动为输出目录中的 .txt 主输出文件，并读取转录文本写入结果
+        
+        参数:
+            merge_txt_path: Client_Only生成的merge.txt文件路径
+            final_txt_path: 主输出文件路径
+            result: 转录结果字典，原地更新
+            return_transcript: 是否读取转录文本
+        """
+        # 一步移动到输出目录并重命名为 .txt 作为主输出
+        try:
+            _move_file(merge_txt_path, final_txt_path)
+            logger.info("主输出文件已保存为: %s", final_txt_path)
+            result["txt_path"] = final_txt_path
+            result["merge_txt_path"] = final_txt_path
+        except OSError as e:
+            logger.warning("移动主输出文件失败: %s", e)
+            result["merge_txt_path"] = merge_txt_path
+        
+        # 调用方只需要文件路径时不再读回文本
+        if not return_transcript:
+            return
+        
+        # 读取转录文本
+        try:
+            result["transcript"] = _read_text(result["merge_txt_path"])
+            logger.info("已从合并文本文件提取转录文本")
+        except Exception as e:
+            logger.warning("读取转录文本失败: %s", e)
+    
+    def transcribe(self, audio_path, output_base=None, return_transcript=True):
         """
         转录音频文件
         
         参数:
             audio_path: 音频文件路径
             output_base: 输出文件基础名，如果为None则使用音频文件名
+            return_transcript: 是否在结果中返回转录文本，为False时只返回文件路径
             
         返回:
             dict: 包含转录结果的字典
-                - transcript: 纯文本转录结果
-                - merge_txt_path: 合并文本文件路径
+                - transcript: 纯文本转录结果（return_transcript为False时为空字符串）
+                - merge_txt_path: 合并文本文件路径（移动成功时即主输出文件）
+                - txt_path: 输出目录中的 .txt 主输出文件路径
         """
         try:
-            logger.info(f"开始转录音频文件: {audio_path}")
+            logger.info("开始转录音频文件: %s", audio_path)
             
             # 如果未指定输出基础名，则使用音频文件名（不含扩展名）
             if output_base is None:
@@ -115,11 +197,12 @@ class Transcriber:
             while attempts < self.max_retries:
                 attempts += 1
                 try:
-                    logger.info(f"调用Client_Only转录文件: {audio_path} (尝试 {attempts}/{self.max_retries})")
-                    success, generated_files = client_transcriber.transcribe(audio_path)
+                    logger.info("调用Client_Only转录文件: %s (尝试 %d/%d)", audio_path, attempts, self.max_retries)
+                    with _CLIENT_LOCK:
+                        success, generated_files = client_transcriber.transcribe(audio_path)
                     
                     if success:
-                        logger.info(f"转录完成，生成文件: {generated_files}")
+                        logger.info("转录完成，生成文件: %s", generated_files)
                         
                         # 准备返回结果
                         result = {
@@ -130,44 +213,11 @@ class Transcriber:
                         # 处理生成的文件
                         for file_path in generated_files:
                             # 将Path对象转换为字符串
-                            if isinstance(file_path, Path):
-                                file_path_str = str(file_path)
-                            else:
-                                file_path_str = file_path
-                                
-                            # 确定目标路径
-                            basename = os.path.basename(file_path_str)
-                            target_path = os.path.join(self.output_dir, basename)
+                            file_path_str = os.fspath(file_path)
                             
-                            # 只处理merge.txt文件
+                            # 只处理merge.txt文件，其他输出格式已在Client_Only配置中关闭
                             if file_path_str.endswith(".merge.txt"):
-                                # 拷贝文件到输出目录（如果不在输出目录中）
-                                if os.path.abspath(file_path_str) != os.path.abspath(target_path):
-                                    shutil.copy2(file_path_str, target_path)
-                                    logger.info(f"合并文本文件已复制到输出目录: {target_path}")
-                                
-                                result["merge_txt_path"] = target_path
-                                
-                                # 读取转录文本
-                                try:
-                                    with open(file_path_str, 'r', encoding='utf-8') as f:
-                                        result["transcript"] = f.read().strip()
-                                    logger.info(f"已从合并文本文件提取转录文本")
-                                except Exception as e:
-                                    logger.warning(f"读取转录文本失败: {str(e)}")
-                                
-                                # 自动重命名为 .txt 作为主输出
-                                if os.path.exists(target_path):
-                                    try:
-                                        shutil.copy2(target_path, final_txt_path)
-                                        logger.info(f"主输出文件已重命名为: {final_txt_path}")
-                                        result["txt_path"] = final_txt_path
-                                        # 删除 .merge.txt 文件
-                                        if os.path.exists(target_path):
-                                            os.remove(target_path)
-                                            logger.info(f"已删除中间文件: {target_path}")
-                                    except Exception as e:
-                                        logger.warning(f"重命名主输出文件失败: {str(e)}")
+                                self._handle_merge_txt(file_path_str, final_txt_path, result, return_transcript)
                         
                         # 确保找到了merge.txt文件
                         if not result["merge_txt_path"]:
@@ -177,16 +227,16 @@ class Transcriber:
                         
                         return result
                     else:
-                        logger.warning(f"转录尝试失败，返回状态: {success}")
+                        logger.warning("转录尝试失败，返回状态: %s", success)
                         last_error = "服务器返回失败状态"
                 
                 except Exception as e:
-                    logger.warning(f"转录尝试 {attempts} 失败: {str(e)}")
+                    logger.warning("转录尝试 %d 失败: %s", attempts, e)
                     last_error = str(e)
                 
                 # 如果不是最后一次尝试，等待后重试
                 if attempts < self.max_retries:
-                    logger.info(f"等待 {self.retry_delay} 秒后重试...")
+                    logger.info("等待 %s 秒后重试...", self.retry_delay)
                     time.sleep(self.retry_delay)
             
             # 达到最大重试次数仍然失败
@@ -195,5 +245,35 @@ class Transcriber:
             raise RuntimeError(error_msg)
             
         except Exception as e:
-            logger.exception(f"转录音频文件失败: {str(e)}")
-            raise
\ No newline at end of file
+            logger.exception("转录音频文件失败: %s", e)
+            raise
+    
+    async def transcribe_batch(self, audio_paths, max_concurrent=None):
+        """
+        并发转录多个音频文件
+        
+        Client_Only客户端调用本身是串行的（见_CLIENT_LOCK），并发只能重叠文件检查、
+        移动和读取等本地处理
+        
+        参数:
+            audio_paths: 音频文件路径列表
+            max_concurrent: 最大并发数，如果为None则使用配置中的capswriter.max_concurrent
+            
+        返回:
+            list: 与audio_paths顺序一致的结果列表，失败的文件对应位置为异常对象
+        """
+        if max_concurrent is None:
+            max_concurrent = self.max_concurrent
+        semaphore = asyncio.Semaphore(max_concurrent)
+        loop = asyncio.get_running_loop()
+        
+        async def transcribe_one(audio_path):
+            async with semaphore:
+                # transcribe为阻塞调用，放到线程池中执行
+                return await loop.run_in_executor(None, self.transcribe, audio_path)
+        
+        logger.info("开始批量转录 %d 个文件，最大并发数: %s", len(audio_paths), max_concurrent)
+        return await asyncio.gather(
+            *(transcribe_one(audio_path) for audio_path in audio_paths),
+            return_exceptions=True
+        )
@@ -1,5 +1,6 @@
-from utils.logger import setup_logger, load_config, ensure_dir
+from utils.logger import setup_logger, load_config, ensure_dir, PROJECT_ROOT, resolve_path
 from utils.wechat import WechatNotifier, wechat_notify
+from utils.cache import TTLCache
 import os
 
 def create_debug_dir():
@@ -9,15 +10,9 @@ def create_debug_dir():
     返回:
         str: 调试日志目录路径
     """
-    # 创建logs目录
-    logs_dir = "logs"
-    if not os.path.exists(logs_dir):
-        os.makedirs(logs_dir)
-    
-    # 创建调试子目录
-    debug_dir = os.path.join(logs_dir, "debug")
-    if not os.path.exists(debug_dir):
-        os.makedirs(debug_dir)
+    # 创建logs目录下的调试子目录
+    debug_dir = resolve_path(os.path.join("logs", "debug"))
+    os.makedirs(debug_dir, exist_ok=True)
     
     return debug_dir
 
@@ -25,7 +20,10 @@ __all__ = [
     "setup_logger", 
     "load_config",
     "ensure_dir",
+    "PROJECT_ROOT",
+    "resolve_path",
     "WechatNotifier",
     "wechat_notify",
-    "create_debug_dir"
+    "create_debug_dir",
+    "TTLCache"
 ] 
\ No newline at end of file
@@ -0,0 +1,68 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    线程安全的LRU缓存，条目在过期时间后自动失效
+    """
+    def __init__(self, maxsize=1024, ttl=3600):
+        """
+        初始化缓存
+        
+        参数:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 默认过期时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """
+        获取缓存值
+        
+        参数:
+            key: 缓存键
+            default: 未命中或已过期时返回的值
+            
+        返回:
+            缓存值或default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存值
+        
+        参数:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），如果为None则使用默认值
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
@@ -1,7 +1,20 @@
+import json
 import requests
 import logging
 import time
 from typing import Optional
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+# 复用HTTP连接的会话，避免每次调用都重新建立TCP/TLS连接
+# 重试由call_llm_api自行控制，连接池层不重试
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
 
 def call_llm_api(model: str, prompt: str, api_key: str, base_url: str, 
                  max_retries: int = 2, retry_delay: int = 5) -> str:
@@ -31,6 +44,11 @@ def call_llm_api(model: str, prompt: str, api_key: str, base_url: str,
         ],
         "stream": False
     }
+    # 请求体只序列化一次，重试时复用
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
     
     last_error = None
     
@@ -39,9 +57,9 @@ def call_llm_api(model: str, prompt: str, api_key: str, base_url: str,
         try:
             logging.info(f"LLM API 调用尝试 {attempt + 1}/{max_retries + 1}")
             
-            resp = requests.post(base_url, json=data, headers=headers, timeout=180)
+            resp = _SESSION.post(base_url, data=body, headers=headers, timeout=180)
             resp.raise_for_status()
-            result = resp.json()
+            result = orjson.loads(resp.content) if orjson is not None else resp.json()
             
             # 成功获取结果
             content = result["choices"][0]["message"]["content"].strip()
@@ -1,16 +1,49 @@
 import os
 import json
 import logging
+import functools
+from pathlib import Path
 from logging.handlers import RotatingFileHandler
 
+# 项目根目录，配置文件和配置中的相对路径都以它为基准，不依赖当前工作目录
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def resolve_path(path):
+    """
+    将相对路径解析为项目根目录下的绝对路径
+    
+    参数:
+        path: 文件或目录路径
+        
+    返回:
+        str: 绝对路径
+    """
+    return str(PROJECT_ROOT / path)
+
+# 配置文件路径
+CONFIG_FILE = PROJECT_ROOT / "config.json"
+
 # 加载配置文件
 def load_config():
     """
     加载配置文件
+    
+    按文件修改时间缓存解析结果，文件未变化时所有调用方共享同一个字典，
+    不应修改返回值；文件被修改后下次调用自动重新加载
+    """
+    return _load_config_file(os.stat(CONFIG_FILE).st_mtime_ns)
+
+@functools.lru_cache(maxsize=1)
+def _load_config_file(mtime_ns):
+    """
+    解析配置文件，以修改时间作为缓存键
     """
-    with open("config.json", "r", encoding="utf-8") as f:
+    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
+# 强制下次调用重新解析配置文件
+load_config.cache_clear = _load_config_file.cache_clear
+
 # 创建日志目录
 def ensure_dir(directory):
     """
@@ -19,25 +52,34 @@ def ensure_dir(directory):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
+# 已配置的日志记录器缓存，避免每个模块导入时重复创建处理程序
+_loggers = {}
+
 # 创建日志对象
-def setup_logger(name, config=None):
+def setup_logger(name, config=None, reconfigure=False):
     """
     设置日志记录器
     
+    同名日志记录器只配置一次，后续调用直接返回缓存的对象
+    
     参数:
         name: 日志记录器名称
         config: 配置信息，如果为None则从配置文件加载
+        reconfigure: 是否强制按当前配置重新创建处理程序
         
     返回:
         logger: 日志记录器对象
     """
+    if name in _loggers and not reconfigure:
+        return _loggers[name]
+    
     if config is None:
         config = load_config()
     
     log_config = config.get("log", {})
     log_level = getattr(logging, log_config.get("level", "INFO"))
     log_format = log_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    log_file = log_config.get("file", "./logs/app.log")
+    log_file = resolve_path(log_config.get("file", "./logs/app.log"))
     max_size = log_config.get("max_size", 10 * 1024 * 1024)  # 默认10MB
     backup_count = log_config.get("backup_count", 5)
     
@@ -49,9 +91,10 @@ def setup_logger(name, config=None):
     logger = logging.getLogger(name)
     logger.setLevel(log_level)
     
-    # 清除现有处理程序（避免重复添加）
-    if logger.handlers:
-        logger.handlers.clear()
+    # 关闭并移除现有处理程序（避免重复添加，同时释放日志文件句柄）
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
     
     # 添加控制台处理程序
     console_handler = logging.StreamHandler()
@@ -60,13 +103,14 @@ def setup_logger(name, config=None):
     console_handler.setFormatter(console_formatter)
     logger.addHandler(console_handler)
     
-    # 添加文件处理程序
+    # 添加文件处理程序，首次写日志时才打开文件
     file_handler = RotatingFileHandler(
-        log_file, maxBytes=max_size, backupCount=backup_count, encoding="utf-8"
+        log_file, maxBytes=max_size, backupCount=backup_count, encoding="utf-8", delay=True
     )
     file_handler.setLevel(log_level)
     file_formatter = logging.Formatter(log_format)
     file_handler.setFormatter(file_formatter)
     logger.addHandler(file_handler)
     
+    _loggers[name] = logger
     return logger 
\ No newline at end of file
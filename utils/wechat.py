@@ -1,25 +1,80 @@
-import json
 import requests
 import datetime
 import re
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from utils.logger import setup_logger, load_config
 
 # 创建日志记录器
 logger = setup_logger("wechat_notifier")
 
+# 复用HTTP连接的会话，webhook请求不再每次重新建立TCP/TLS连接
+# 连接池层只重试建立连接失败的情况，避免重复发送已送达的消息
+_RETRY = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY))
+
+# 后台发送通知的线程池，单线程保证通知按提交顺序送达
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wechat_notify")
+
+# 长文本分段发送失败时的重试次数与退避基数（秒）
+_LONG_TEXT_RETRIES = 2
+_LONG_TEXT_BACKOFF = 0.5
+
+# 长文本每段前缀中标题和URL的字节上限，超出时截断，保证每段仍有足够空间放正文
+_MAX_TITLE_BYTES = 512
+_MAX_URL_BYTES = 1024
+
+# 小红书域名与需要保留的 xsec_token 参数
+_XHS_HOST = re.compile(r'xiaohongshu\.com|xhslink\.com')
+_XSEC_RE = re.compile(r'(?:^|&)(xsec_token=[^&]*)')
+
+@lru_cache(maxsize=256)
+def _clean_url(url):
+    """
+    清洗URL，移除问号后的追踪参数
+    
+    对于小红书链接，保留 xsec_token 参数，其他参数去除。
+    同一任务的通知与长文本发送会重复清洗同一URL，结果做了缓存。
+    
+    参数:
+        url: 原始URL
+        
+    返回:
+        str: 清洗后的URL
+    """
+    base, sep, query = url.partition("?")
+    if not sep:
+        # 没有查询参数，无需清洗
+        return url
+    if _XHS_HOST.search(base) is not None:
+        # 只保留 xsec_token 参数
+        kept = _XSEC_RE.findall(query)
+        if kept:
+            return base + "?" + "&".join(kept)
+    return base
+
 class WechatNotifier:
     """
     企业微信通知类
     """
-    def __init__(self, webhook=None):
+    def __init__(self, webhook=None, config=None):
         """
         初始化企业微信通知器
         
         参数:
-            webhook: 企业微信webhook地址，如果为None则从配置文件加载
+            webhook: 企业微信webhook地址，如果为None则从配置中获取
+            config: 配置信息，如果为None且未提供webhook则从配置文件加载
         """
-        config = load_config()
-        self.webhook = webhook or config.get("wechat", {}).get("webhook")
+        if not webhook:
+            if not config:
+                config = load_config()
+            webhook = config.get("wechat", {}).get("webhook")
+        self.webhook = webhook
         if not self.webhook:
             logger.warning("企业微信webhook未配置")
     
@@ -45,28 +100,37 @@ class WechatNotifier:
                 }
             }
             
-            response = requests.post(
-                self.webhook,
-                data=json.dumps(data),
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
+            response = _SESSION.post(self.webhook, json=data, timeout=5)
             
             if response.status_code == 200 and response.json().get("errcode") == 0:
-                logger.info(f"企业微信通知发送成功: {content[:50]}...")
+                logger.info("企业微信通知发送成功: %.50s...", content)
                 return True
             else:
-                logger.error(f"企业微信通知发送失败: {response.text}")
+                logger.error("企业微信通知发送失败: %s", response.text)
                 return False
         except Exception as e:
-            logger.exception(f"企业微信通知发送异常: {str(e)}")
+            logger.exception("企业微信通知发送异常: %s", e)
             return False
+    
+    def send_text_async(self, content):
+        """
+        在后台线程中发送文本消息，不阻塞调用方
+        
+        参数:
+            content: 要发送的文本内容
+            
+        返回:
+            Future: 结果为发送是否成功
+        """
+        return _EXECUTOR.submit(self.send_text, content)
 
-    def _clean_url(self, url):
+    @staticmethod
+    def _clean_url(url):
         """
         清洗URL，移除问号后的追踪参数
         
         对于小红书链接，保留 xsec_token 参数，其他参数去除。
+        不依赖实例状态，无需为清洗URL单独构造通知器。
         
         参数:
             url: 原始URL
@@ -74,25 +138,7 @@ class WechatNotifier:
         返回:
             str: 清洗后的URL
         """
-        if "xiaohongshu.com" in url or "xhslink.com" in url:
-            # 只保留 xsec_token 参数
-            if "?" in url:
-                base, query = url.split("?", 1)
-                params = query.split("&")
-                kept = []
-                for p in params:
-                    if p.startswith("xsec_token="):
-                        kept.append(p)
-                if kept:
-                    return base + "?" + "&".join(kept)
-                else:
-                    return base
-            else:
-                return url
-        else:
-            if "?" in url:
-                return url.split("?")[0]
-            return url
+        return _clean_url(url)
 
     def notify_task_status(self, url, status, error=None, title=None, author=None, transcript=None):
         """
@@ -107,7 +153,7 @@ class WechatNotifier:
             transcript: 转录文本，如果有的话
             
         返回:
-            bool: 发送是否成功
+            Future: 后台发送任务，结果为发送是否成功
         """
         # 添加时间戳前缀
         timestamp = datetime.datetime.now().strftime("%y%m%d-%H%M%S")
@@ -115,26 +161,28 @@ class WechatNotifier:
         # 清洗URL
         clean_url = self._clean_url(url)
         
-        # 构建通知内容
-        content = f"{timestamp}\n视频转录任务状态更新:\n链接: {clean_url}\n状态: {status}"
+        # 构建通知内容，逐行收集后一次性拼接
+        parts = [timestamp, "视频转录任务状态更新:", f"链接: {clean_url}", f"状态: {status}"]
         
         # 添加标题和作者信息（如果有）
         if title:
-            content += f"\n标题: {title}"
+            parts.append(f"标题: {title}")
         if author:
-            content += f"\n作者: {author}"
+            parts.append(f"作者: {author}")
             
         # 添加错误信息（如果有）
         if error:
-            content += f"\n错误: {error}"
+            parts.append(f"错误: {error}")
             
         # 添加转录文本预览（如果有）
         if transcript and status == "转录完成":
             # 最多显示前400个字符
             preview = transcript[:100] + ("..." if len(transcript) > 100 else "")
-            content += f"\n\n{preview}"
-            
-        return self.send_text(content)
+            parts.append("")
+            parts.append(preview)
+        
+        content = "\n".join(parts)
+        return self.send_text_async(content)
 
 def wechat_notify(message, webhook=None, config=None):
     """
@@ -146,35 +194,93 @@ def wechat_notify(message, webhook=None, config=None):
         config: 配置字典，如果提供则从中获取webhook
         
     返回:
-        bool: 发送是否成功
+        Future: 后台发送任务，结果为发送是否成功
+    """
+    notifier = WechatNotifier(webhook, config=config)
+    return notifier.send_text_async(message)
+
+def _split_text_by_bytes(text, max_bytes):
     """
-    if config and not webhook:
-        webhook = config.get("wechat", {}).get("webhook")
+    按UTF-8字节数切分文本，不会把一个字符拆到两段
+    
+    参数:
+        text: 要切分的文本
+        max_bytes: 每段的最大字节数，必须大于0
         
-    notifier = WechatNotifier(webhook)
-    return notifier.send_text(message)
+    返回:
+        list: 文本片段列表
+    """
+    if max_bytes <= 0:
+        raise ValueError(f"每段最大字节数必须大于0: {max_bytes}")
+    if text.isascii():
+        # 纯ASCII文本每个字符恰好一个字节，直接按字符切片，无需编码
+        return [text[i:i + max_bytes] for i in range(0, len(text), max_bytes)]
+    # 整体编码一次，直接在字节上定位切分点
+    data = text.encode('utf-8')
+    data_len = len(data)
+    if 0 < data_len <= max_bytes:
+        # 不需要切分时直接返回原文，省去解码复制
+        return [text]
+    chunks = []
+    start = 0
+    while start < data_len:
+        end = min(start + max_bytes, data_len)
+        # 切分点落在多字节字符中间时回退到字符起始（UTF-8后续字节形如10xxxxxx）
+        while end < data_len and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        if end == start:
+            # 上限小于单个字符的字节数，至少放入一个完整字符
+            end += 1
+            while end < data_len and (data[end] & 0xC0) == 0x80:
+                end += 1
+        chunks.append(data[start:end].decode('utf-8'))
+        start = end
+    return chunks
+
+def _truncate_by_bytes(text, max_bytes):
+    """
+    按UTF-8字节数截断文本，超出时保留开头部分并以省略号结尾
+    
+    参数:
+        text: 要截断的文本
+        max_bytes: 最大字节数（含省略号）
+        
+    返回:
+        str: 截断后的文本
+    """
+    if len(text.encode('utf-8')) <= max_bytes:
+        return text
+    return _split_text_by_bytes(text, max_bytes - 3)[0] + "..."
 
 def send_long_text_wechat(title, url, text, is_summary=False, webhook=None):
     """
     分段发送长文本到企业微信，自动按2048字节分割，格式为：标题、url、正文
+    
+    各段按顺序逐条发送，保证接收端看到的正文顺序正确；单段失败时按指数退避
+    重试，仍失败则跳过该段继续发送，最后汇总记录一次失败信息
+    
+    返回:
+        bool: 所有分段是否均发送成功
     """
     max_bytes = 4000
-    clean_url = WechatNotifier()._clean_url(url)
-    prefix = f"标题：{title or ''}\nurl：{clean_url}\n{'总结文本' if is_summary else '校对文本'}\n"
+    notifier = WechatNotifier(webhook)
+    # 标题和URL过长时截断，避免前缀占满单条消息的字节上限
+    short_title = _truncate_by_bytes(title or '', _MAX_TITLE_BYTES)
+    clean_url = _truncate_by_bytes(_clean_url(url), _MAX_URL_BYTES)
+    prefix = f"标题：{short_title}\nurl：{clean_url}\n{'总结文本' if is_summary else '校对文本'}\n"
     prefix_bytes = len(prefix.encode('utf-8'))
     max_content_bytes = max_bytes - prefix_bytes
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = start
-        curr_bytes = 0
-        # 按字符递增，保证utf-8分割安全
-        while end < text_len:
-            char_bytes = len(text[end].encode('utf-8'))
-            if curr_bytes + char_bytes > max_content_bytes:
+    contents = [prefix + chunk for chunk in _split_text_by_bytes(text, max_content_bytes)]
+    failed = []
+    for i, content in enumerate(contents, 1):
+        for attempt in range(_LONG_TEXT_RETRIES + 1):
+            if notifier.send_text(content):
                 break
-            curr_bytes += char_bytes
-            end += 1
-        content = prefix + text[start:end]
-        WechatNotifier(webhook).send_text(content)
-        start = end 
\ No newline at end of file
+            if attempt < _LONG_TEXT_RETRIES:
+                time.sleep(_LONG_TEXT_BACKOFF * (2 ** attempt))
+        else:
+            failed.append(i)
+    if failed:
+        logger.error("长文本分段发送失败: 标题=%s, 共%d段, 失败段=%s", title, len(contents), failed)
+        return False
+    return True 
\ No newline at end of file